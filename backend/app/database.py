@@ -1,20 +1,259 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.exc import OperationalError
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, Index
+from contextlib import asynccontextmanager
 from datetime import datetime
+import asyncio
 import os
+import time
 
 # Database URL - using SQLite for development, can be changed to PostgreSQL for production
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fitness_planner.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
-)
+# Engine profile - dev, sqlite-prod or postgres-prod
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "dev")
+
+ENGINE_PROFILES = {
+    # Driver defaults, as before profiles existed
+    "dev": {
+        "backend": None,
+        "pragmas": {},
+        "engine": {}
+    },
+    # WAL lets readers run alongside the single writer; synchronous=NORMAL
+    # only fsyncs at checkpoints, which WAL keeps crash-safe
+    "sqlite-prod": {
+        "backend": "sqlite",
+        "pragmas": {
+            "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024))),  # negative = KiB
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+            "temp_store": "MEMORY"
+        },
+        "engine": {}
+    },
+    "postgres-prod": {
+        "backend": "postgresql",
+        "pragmas": {},
+        "engine": {
+            "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "20")),
+            "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+            "pool_pre_ping": True,
+            "pool_recycle": int(os.getenv("DATABASE_POOL_RECYCLE", "1800")),
+            # SQLAlchemy's compiled-statement cache
+            "query_cache_size": int(os.getenv("DATABASE_QUERY_CACHE_SIZE", "1200"))
+        },
+        # asyncpg's per-connection prepared statement cache
+        "async_connect_args": {
+            "prepared_statement_cache_size": int(os.getenv("DATABASE_PREPARED_STATEMENT_CACHE_SIZE", "500"))
+        }
+    }
+}
+
+def engine_profile(url: str, profile: str = DATABASE_PROFILE) -> dict:
+    """Look up an engine profile and check it suits the database URL"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE: {profile}. Must be one of: {list(ENGINE_PROFILES)}")
+    settings = ENGINE_PROFILES[profile]
+    if settings["backend"] and not url.startswith(settings["backend"]):
+        raise ValueError(f"DATABASE_PROFILE {profile} needs a {settings['backend']} database URL")
+    return settings
+
+def set_sqlite_pragmas(engine, pragmas: dict):
+    """Run PRAGMA statements on every new SQLite connection"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def build_engine(url: str, profile: str = DATABASE_PROFILE):
+    """Create the sync engine for a URL with a profile's settings"""
+    settings = engine_profile(url, profile)
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {},
+        **settings["engine"]
+    )
+    set_sqlite_pragmas(engine, settings["pragmas"])
+    return engine
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+def build_async_engine(url: str, profile: str = DATABASE_PROFILE):
+    """Create the async engine for an async-driver URL with a profile's settings"""
+    settings = engine_profile(url, profile)
+    engine = create_async_engine(
+        url,
+        connect_args=settings.get("async_connect_args", {}),
+        **settings["engine"]
+    )
+    set_sqlite_pragmas(engine.sync_engine, settings["pragmas"])
+    return engine
+
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API routers so queries don't block the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", get_async_database_url(SQLALCHEMY_DATABASE_URL))
+
+async_engine = build_async_engine(ASYNC_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for analytics, listings and lookups (sync URL form)
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+
+# Replica lag beyond this sends reads to the primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+
+# How long a replica health check is trusted before it is repeated
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+
+# Longest a replica health check may take before the replica counts as down
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", "1"))
+
+# Postgres standbys report how far replay trails the primary; a standby that
+# has replayed everything it received is current even if the primary is idle
+POSTGRES_REPLICA_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class ReadReplica:
+    """
+    Hands out sessions on the read replica while it is reachable and within
+    max_lag seconds of the primary, and on the primary otherwise.
+
+    Health is checked at most once per check_interval and shared by every
+    request in between. A replica that errors during a request is taken out
+    of rotation until the next check. Without a replica engine every read
+    goes to the primary.
+    """
+
+    def __init__(self, engine=None, max_lag: float = 5.0, check_interval: float = 5.0,
+                 check_timeout: float = 1.0, primary_session_factory=AsyncSessionLocal):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.primary_session_factory = primary_session_factory
+        self.replica_session_factory = (
+            async_sessionmaker(engine, autoflush=False, expire_on_commit=False) if engine is not None else None
+        )
+        self._lock = None
+        self._healthy = False
+        self._checked_at = None
+
+        self.lag_seconds = None
+        self.last_error = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    async def _measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                return float(await conn.scalar(POSTGRES_REPLICA_LAG))
+            # SQLite has no replication to measure; reachable means current
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def _check(self) -> bool:
+        try:
+            lag = await asyncio.wait_for(self._measure_lag(), self.check_timeout)
+        except Exception as e:
+            self.lag_seconds = None
+            self.last_error = str(e) or type(e).__name__
+            return False
+
+        self.lag_seconds = lag
+        if lag > self.max_lag:
+            self.last_error = f"Replica lag {lag:.1f}s exceeds {self.max_lag}s"
+            return False
+        self.last_error = None
+        return True
+
+    async def available(self) -> bool:
+        """Whether reads should go to the replica right now"""
+        if self.engine is None:
+            return False
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                self._healthy = await self._check()
+                self._checked_at = time.monotonic()
+        return self._healthy
+
+    def mark_unavailable(self, error: Exception):
+        """Route reads to the primary until the next health check"""
+        self._healthy = False
+        self._checked_at = time.monotonic()
+        self.last_error = str(error)
+
+    @asynccontextmanager
+    async def session(self):
+        """An AsyncSession on the replica, or on the primary as a fallback"""
+        if not await self.available():
+            if self.engine is not None:
+                self.fallbacks += 1
+            self.primary_reads += 1
+            async with self.primary_session_factory() as db:
+                yield db
+            return
+
+        self.replica_reads += 1
+        async with self.replica_session_factory() as db:
+            try:
+                yield db
+            except OperationalError as e:
+                self.mark_unavailable(e)
+                raise
+
+    def stats(self) -> dict:
+        """Get routing and replica health metrics"""
+        return {
+            "configured": self.engine is not None,
+            "healthy": self._healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "fallbacks": self.fallbacks
+        }
+
+read_replica = ReadReplica(
+    engine=build_async_engine(
+        get_async_database_url(READ_DATABASE_URL), os.getenv("READ_DATABASE_PROFILE", DATABASE_PROFILE)
+    ) if READ_DATABASE_URL else None,
+    max_lag=REPLICA_MAX_LAG_SECONDS,
+    check_interval=REPLICA_CHECK_INTERVAL,
+    check_timeout=REPLICA_CHECK_TIMEOUT
+)
+
 Base = declarative_base()
 
 # Database Models
@@ -29,6 +268,11 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination order for listings
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
 class HealthPlan(Base):
     __tablename__ = "health_plans"
 
@@ -51,6 +295,44 @@ class HealthPlan(Base):
     sleep_recommendation = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination order for listings; also serves created_at ranges
+        Index("ix_health_plans_created_at_id", "created_at", "id"),
+        # Per-goal analytics and exports over a time range
+        Index("ix_health_plans_goal_created_at", "fitness_goal", "created_at"),
+    )
+
+class AnalyticsRollup(Base):
+    """Running aggregates over health_plans, maintained on every insert and delete"""
+    __tablename__ = "analytics_rollups"
+
+    dimension = Column(String, primary_key=True)  # total, goal, gender, age_group or day
+    bucket = Column(String, primary_key=True)
+    plan_count = Column(Integer, default=0, nullable=False)
+    bmi_sum = Column(Float, default=0, nullable=False)
+    bmi_count = Column(Integer, default=0, nullable=False)
+    daily_calories_sum = Column(Float, default=0, nullable=False)
+    daily_calories_count = Column(Integer, default=0, nullable=False)
+    bmr_sum = Column(Float, default=0, nullable=False)
+    bmr_count = Column(Integer, default=0, nullable=False)
+
+class PlanTimeBucket(Base):
+    """Plan counts per goal, pre-bucketed by hour, day, week and month"""
+    __tablename__ = "plan_time_buckets"
+
+    granularity = Column(String, primary_key=True)  # hour, day, week or month
+    bucket_start = Column(DateTime, primary_key=True)
+    fitness_goal = Column(String, primary_key=True)
+    plan_count = Column(Integer, default=0, nullable=False)
+
+class AnalyticsSketch(Base):
+    """Serialized distribution sketch, merged into periodically by each worker"""
+    __tablename__ = "analytics_sketches"
+
+    key = Column(String, primary_key=True)  # metric|group|bucket, or profiles|group|bucket
+    payload = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class UserProgress(Base):
     __tablename__ = "user_progress"
 
@@ -61,6 +343,23 @@ class UserProgress(Base):
     notes = Column(Text)
     recorded_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Per-user history reads and keyset pages in recorded order
+        Index("ix_user_progress_user_recorded_at", "user_id", "recorded_at", "id"),
+    )
+
+class ProgressRollup(Base):
+    """Weekly and monthly weight aggregates per user, maintained on every progress insert"""
+    __tablename__ = "progress_rollups"
+
+    user_id = Column(Integer, primary_key=True)
+    granularity = Column(String, primary_key=True)  # week or month
+    bucket_start = Column(DateTime, primary_key=True)
+    entry_count = Column(Integer, default=0, nullable=False)
+    weight_sum = Column(Float, default=0, nullable=False)
+    weight_min = Column(Float)
+    weight_max = Column(Float)
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -68,3 +367,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency to get an async session for reads that tolerate replica lag
+async def get_read_db():
+    async with read_replica.session() as db:
+        yield db
@@ -1,21 +1,26 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 import os
 
-from app.routers import health_plans, users, analytics
-from app.database import engine, Base
+from app.routers import health_plans, users, analytics, progress
+from app.database import read_replica
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.plan_writer import plan_writer
+from app.utils.sketches import distribution_sketches
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic migrations: run `python manage.py migrate`
+# before starting the API (start.py does this for development)
 
 app = FastAPI(
     title="Fitness Health Planner API",
     description="A comprehensive API for generating personalized fitness and health plans",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson encodes responses several times faster than the stdlib encoder
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -25,12 +30,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+@app.on_event("startup")
+async def start_plan_writer():
+    """Start write-behind persistence when PLAN_WRITE_MODE=write-behind"""
+    if plan_writer.enabled:
+        await plan_writer.start()
+
+@app.on_event("startup")
+async def start_distribution_sketches():
+    """Load stored distribution sketches and persist them periodically"""
+    await distribution_sketches.start()
+
+@app.on_event("shutdown")
+async def stop_plan_writer():
+    """Flush queued health plans before the worker exits"""
+    await plan_writer.stop()
+
+@app.on_event("shutdown")
+async def stop_distribution_sketches():
+    """Persist sketch updates not yet saved"""
+    await distribution_sketches.stop()
+
 # Include routers
 app.include_router(health_plans.router, prefix="/api/v1", tags=["Health Plans"])
 app.include_router(users.router, prefix="/api/v1", tags=["Users"])
 app.include_router(analytics.router, prefix="/api/v1", tags=["Analytics"])
+app.include_router(progress.router, prefix="/api/v1", tags=["Progress"])
 
 # Serve static files (frontend)
 if os.path.exists("../index.html"):
@@ -47,7 +75,8 @@ async def health_check():
     return {
         "status": "healthy",
         "message": "Fitness Health Planner API is running",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "read_replica": read_replica.stats()
     }
 
 @app.get("/api")
@@ -61,6 +90,7 @@ async def api_info():
             "health_plans": "/api/v1/health-plans",
             "users": "/api/v1/users",
             "analytics": "/api/v1/analytics",
+            "progress": "/api/v1/progress",
             "docs": "/docs",
             "redoc": "/redoc"
         }
@@ -1,8 +1,17 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field, AfterValidator
+from typing import Optional, List, Dict, Annotated
+from datetime import datetime, timezone
 from enum import Enum
 
+def to_naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, the form stored in the database; naive values are taken as UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Datetime input normalized to naive UTC
+UTCDateTime = Annotated[datetime, AfterValidator(to_naive_utc)]
+
 class Gender(str, Enum):
     male = "male"
     female = "female"
@@ -22,6 +31,11 @@ class FitnessGoal(str, Enum):
 
 # Request Models
 class UserDataRequest(BaseModel):
+    """
+    Plan generation input. Every check is a native constraint, so the whole
+    model is validated in one pass by pydantic-core; instances are trusted
+    by HealthCalculator without re-checking.
+    """
     age: int = Field(..., ge=13, le=120, description="Age in years (13-120)")
     gender: Gender = Field(..., description="User gender")
     height: float = Field(..., ge=100, le=250, description="Height in cm (100-250)")
@@ -29,23 +43,8 @@ class UserDataRequest(BaseModel):
     activity_level: ActivityLevel = Field(..., description="Activity level")
     fitness_goal: FitnessGoal = Field(..., description="Fitness goal")
 
-    @validator('age')
-    def validate_age(cls, v):
-        if v < 13 or v > 120:
-            raise ValueError('Age must be between 13 and 120 years')
-        return v
-
-    @validator('height')
-    def validate_height(cls, v):
-        if v < 100 or v > 250:
-            raise ValueError('Height must be between 100 and 250 cm')
-        return v
-
-    @validator('weight')
-    def validate_weight(cls, v):
-        if v < 30 or v > 300:
-            raise ValueError('Weight must be between 30 and 300 kg')
-        return v
+class BatchUserDataRequest(BaseModel):
+    users: List[UserDataRequest] = Field(..., min_length=1, max_length=50000, description="User input rows (1-50000)")
 
 class UserCreate(BaseModel):
     email: str = Field(..., description="User email address")
@@ -61,6 +60,12 @@ class ProgressUpdate(BaseModel):
     current_height: Optional[float] = Field(None, ge=100, le=250, description="Current height in cm")
     notes: Optional[str] = Field(None, max_length=1000, description="Progress notes")
 
+class ProgressEntry(ProgressUpdate):
+    recorded_at: Optional[UTCDateTime] = Field(None, description="When the measurement was taken (defaults to now)")
+
+class ProgressBatchRequest(BaseModel):
+    entries: List[ProgressEntry] = Field(..., min_length=1, max_length=10000, description="Progress entries (1-10000)")
+
 # Response Models
 class HealthMetrics(BaseModel):
     bmi: float = Field(..., description="Body Mass Index")
@@ -99,6 +104,24 @@ class HealthPlanResponse(BaseModel):
     health_tips: List[str] = Field(..., description="General health tips")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Plan creation timestamp")
 
+class BatchHealthPlanItem(BaseModel):
+    user_data: UserDataRequest = Field(..., description="User input data")
+    metrics: HealthMetrics = Field(..., description="Health metrics")
+    daily_calories: int = Field(..., description="Daily calorie target")
+    macros: Macronutrients = Field(..., description="Macronutrient breakdown")
+    water_intake: str = Field(..., description="Water intake recommendation")
+    sleep_recommendation: str = Field(..., description="Sleep recommendation")
+
+class GoalRecommendations(BaseModel):
+    activity_recommendations: ActivityRecommendations = Field(..., description="Activity recommendations")
+    timeline_estimates: TimelineEstimates = Field(..., description="Timeline estimates")
+
+class BatchHealthPlanResponse(BaseModel):
+    total_plans: int = Field(..., description="Number of plans generated")
+    plans: List[BatchHealthPlanItem] = Field(..., description="Generated plans, in request order")
+    goal_recommendations: Dict[str, GoalRecommendations] = Field(..., description="Goal-specific recommendations, once per goal in the batch")
+    created_at: datetime = Field(default_factory=datetime.utcnow, description="Batch creation timestamp")
+
 class UserResponse(BaseModel):
     id: int = Field(..., description="User ID")
     email: str = Field(..., description="User email")
@@ -106,6 +129,26 @@ class UserResponse(BaseModel):
     is_active: bool = Field(..., description="User active status")
     created_at: datetime = Field(..., description="Account creation date")
 
+class HealthPlanRecord(BaseModel):
+    id: int = Field(..., description="Health plan ID")
+    user_id: Optional[int] = Field(None, description="Owning user ID")
+    age: int = Field(..., description="Age in years")
+    gender: str = Field(..., description="User gender")
+    height: float = Field(..., description="Height in cm")
+    weight: float = Field(..., description="Weight in kg")
+    activity_level: str = Field(..., description="Activity level")
+    fitness_goal: str = Field(..., description="Fitness goal")
+    bmi: Optional[float] = Field(None, description="Body Mass Index")
+    bmr: Optional[float] = Field(None, description="Basal Metabolic Rate")
+    tdee: Optional[float] = Field(None, description="Total Daily Energy Expenditure")
+    daily_calories: Optional[int] = Field(None, description="Daily calorie target")
+    protein_grams: Optional[int] = Field(None, description="Protein in grams")
+    carbs_grams: Optional[int] = Field(None, description="Carbohydrates in grams")
+    fat_grams: Optional[int] = Field(None, description="Fat in grams")
+    water_intake: Optional[str] = Field(None, description="Water intake recommendation")
+    sleep_recommendation: Optional[str] = Field(None, description="Sleep recommendation")
+    created_at: datetime = Field(..., description="Plan creation timestamp")
+
 class ProgressResponse(BaseModel):
     id: int = Field(..., description="Progress entry ID")
     user_id: int = Field(..., description="User ID")
@@ -114,6 +157,29 @@ class ProgressResponse(BaseModel):
     notes: Optional[str] = Field(None, description="Progress notes")
     recorded_at: datetime = Field(..., description="Recording timestamp")
 
+class ProgressBatchResponse(BaseModel):
+    user_id: int = Field(..., description="User ID")
+    inserted: int = Field(..., description="Number of entries stored")
+    entries: List[ProgressResponse] = Field(..., description="Stored entries in request order")
+
+class ProgressPage(BaseModel):
+    items: List[ProgressResponse] = Field(..., description="Progress entries on this page, oldest first")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+class ProgressPoint(BaseModel):
+    recorded_at: datetime = Field(..., description="Entry time, or bucket start for rollups")
+    weight: float = Field(..., description="Weight, or bucket average for rollups")
+    min_weight: Optional[float] = Field(None, description="Lowest weight in the bucket (rollups only)")
+    max_weight: Optional[float] = Field(None, description="Highest weight in the bucket (rollups only)")
+    entries: int = Field(1, description="Progress entries the point stands for")
+
+class ProgressHistory(BaseModel):
+    user_id: int = Field(..., description="User ID")
+    resolution: str = Field(..., description="raw, week or month")
+    method: Optional[str] = Field(None, description="Downsampling method, null if the series was not downsampled")
+    source_points: int = Field(..., description="Entries or buckets in the range before downsampling")
+    points: List[ProgressPoint] = Field(..., description="Chart points, oldest first")
+
 class Token(BaseModel):
     access_token: str = Field(..., description="JWT access token")
     token_type: str = Field(default="bearer", description="Token type")
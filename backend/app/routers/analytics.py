@@ -1,85 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, case, and_
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+import math
 
-from app.database import get_db, HealthPlan, UserProgress
+from app.database import get_read_db, HealthPlan, UserProgress
 from app.models import Message
+from app.utils.analytics_snapshot import analytics_snapshot, trend_series, TREND_DAYS
+from app.utils.rollups import read_time_series
+from app.utils.columnar_store import (
+    write_snapshots, partition_info, query_snapshot, month_range, GROUP_COLUMNS, METRIC_COLUMNS, AGGREGATES
+)
+from app.utils.sketches import (
+    distribution_sketches, SKETCH_METRICS, SKETCH_GROUPS, KLL_RANK_ERROR, HLL_RELATIVE_ERROR
+)
 
 router = APIRouter()
 
+# Longest series /analytics/trends returns; coarser granularities cover longer windows
+MAX_TREND_BUCKETS = 10000
+BUCKET_DAYS = {"hour": 1 / 24, "day": 1, "week": 7, "month": 28}
+
+# Histogram bin edges for goal distributions (first and last bins are open-ended)
+BMI_HISTOGRAM_EDGES = (18.5, 25, 30, 35, 40)
+CALORIE_HISTOGRAM_EDGES = (1500, 2000, 2500, 3000, 3500)
+
+def histogram_labels(edges: tuple) -> list:
+    """Labels for the open-ended bins defined by edges"""
+    labels = [f"<{edges[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(edges, edges[1:])]
+    labels.append(f"{edges[-1]}+")
+    return labels
+
+def metric_aggregates(column, name: str, edges: tuple) -> list:
+    """Labeled aggregate expressions for one metric's summary statistics and histogram"""
+    bounds = [None, *edges, None]
+    bins = []
+    for index, (low, high) in enumerate(zip(bounds, bounds[1:])):
+        conditions = [column.isnot(None)]
+        if low is not None:
+            conditions.append(column >= low)
+        if high is not None:
+            conditions.append(column < high)
+        bins.append(func.sum(case((and_(*conditions), 1), else_=0)).label(f'{name}_bin_{index}'))
+
+    return [
+        func.count(column).label(f'{name}_count'),
+        func.avg(column).label(f'{name}_avg'),
+        func.min(column).label(f'{name}_min'),
+        func.max(column).label(f'{name}_max'),
+        # SQLite has no STDDEV, so carry the sum of squares instead
+        func.sum(column * column).label(f'{name}_sum_squares'),
+        *bins
+    ]
+
+def metric_distribution(stats, name: str, edges: tuple, digits: int) -> dict:
+    """Build a metric's distribution from the aggregates produced by metric_aggregates"""
+    count = stats[f'{name}_count']
+    if not count:
+        return {"count": 0, "min": None, "max": None, "stddev": None, "histogram": []}
+
+    mean = stats[f'{name}_avg']
+    variance = max(stats[f'{name}_sum_squares'] / count - mean * mean, 0.0)
+
+    return {
+        "count": count,
+        "min": round(stats[f'{name}_min'], digits),
+        "max": round(stats[f'{name}_max'], digits),
+        "stddev": round(math.sqrt(variance), 2),
+        "histogram": [
+            {"range": label, "count": stats[f'{name}_bin_{index}'] or 0}
+            for index, label in enumerate(histogram_labels(edges))
+        ]
+    }
+
 @router.get("/analytics/overview")
-async def get_analytics_overview(db: Session = Depends(get_db)):
+async def get_analytics_overview():
     """
     Get comprehensive analytics overview.
+    Served from the shared analytics snapshot, refreshed at most once per TTL.
     """
     try:
-        # Total health plans generated
-        total_plans = db.query(HealthPlan).count()
-        
-        # Plans generated today
-        today = datetime.utcnow().date()
-        plans_today = db.query(HealthPlan).filter(
-            func.date(HealthPlan.created_at) == today
-        ).count()
-        
-        # Plans generated this week
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        plans_this_week = db.query(HealthPlan).filter(
-            HealthPlan.created_at >= week_ago
-        ).count()
-        
-        # Goal distribution
-        goal_stats = db.query(
-            HealthPlan.fitness_goal,
-            func.count(HealthPlan.id).label('count')
-        ).group_by(HealthPlan.fitness_goal).all()
-        
-        goal_distribution = {goal: count for goal, count in goal_stats}
-        
-        # Average metrics
-        avg_metrics = db.query(
-            func.avg(HealthPlan.bmi).label('avg_bmi'),
-            func.avg(HealthPlan.daily_calories).label('avg_calories'),
-            func.avg(HealthPlan.bmr).label('avg_bmr')
-        ).first()
-        
-        # Gender distribution
-        gender_stats = db.query(
-            HealthPlan.gender,
-            func.count(HealthPlan.id).label('count')
-        ).group_by(HealthPlan.gender).all()
-        
-        gender_distribution = {gender: count for gender, count in gender_stats}
-        
-        # Age group distribution
-        age_groups = db.query(
-            func.case(
-                (HealthPlan.age < 25, '18-24'),
-                (HealthPlan.age < 35, '25-34'),
-                (HealthPlan.age < 45, '35-44'),
-                (HealthPlan.age < 55, '45-54'),
-                (HealthPlan.age < 65, '55-64'),
-                else_='65+'
-            ).label('age_group'),
-            func.count(HealthPlan.id).label('count')
-        ).group_by('age_group').all()
-        
-        age_distribution = {age_group: count for age_group, count in age_groups}
+        snapshot = await analytics_snapshot.get()
+        averages = snapshot["average_metrics"]
         
         return {
-            "total_plans_generated": total_plans,
-            "plans_today": plans_today,
-            "plans_this_week": plans_this_week,
-            "goal_distribution": goal_distribution,
-            "gender_distribution": gender_distribution,
-            "age_distribution": age_distribution,
+            "total_plans_generated": snapshot["total_plans"],
+            "plans_today": snapshot["plans_today"],
+            "plans_this_week": snapshot["plans_this_week"],
+            "goal_distribution": snapshot["goal_distribution"],
+            "gender_distribution": snapshot["gender_distribution"],
+            "age_distribution": snapshot["age_distribution"],
             "average_metrics": {
-                "bmi": round(avg_metrics.avg_bmi, 2) if avg_metrics.avg_bmi else None,
-                "daily_calories": round(avg_metrics.avg_calories, 0) if avg_metrics.avg_calories else None,
-                "bmr": round(avg_metrics.avg_bmr, 0) if avg_metrics.avg_bmr else None
-            }
+                "bmi": round(averages["bmi"], 2) if averages["bmi"] else None,
+                "daily_calories": round(averages["daily_calories"], 0) if averages["daily_calories"] else None,
+                "bmr": round(averages["bmr"], 0) if averages["bmr"] else None
+            },
+            "generated_at": snapshot["generated_at"]
         }
         
     except Exception as e:
@@ -91,10 +110,12 @@ async def get_analytics_overview(db: Session = Depends(get_db)):
 @router.get("/analytics/goals/{goal_type}")
 async def get_goal_analytics(
     goal_type: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get analytics for a specific fitness goal.
+    Averages, min/max/stddev and BMI and calorie histograms are computed
+    in a single aggregate query.
     """
     valid_goals = ["weight-loss", "weight-gain", "lean-body"]
     
@@ -105,45 +126,51 @@ async def get_goal_analytics(
         )
     
     try:
-        # Get plans for specific goal
-        goal_plans = db.query(HealthPlan).filter(
-            HealthPlan.fitness_goal == goal_type
-        ).all()
-        
-        if not goal_plans:
+        # One aggregate pass: counts, averages, spread and histograms
+        stats = (await db.execute(
+            select(
+                func.count(HealthPlan.id).label('total_plans'),
+                *metric_aggregates(HealthPlan.bmi, 'bmi', BMI_HISTOGRAM_EDGES),
+                *metric_aggregates(HealthPlan.daily_calories, 'daily_calories', CALORIE_HISTOGRAM_EDGES),
+                func.avg(HealthPlan.bmr).label('bmr_avg')
+            ).where(HealthPlan.fitness_goal == goal_type)
+        )).one()._mapping
+        
+        total_plans = stats['total_plans']
+        if not total_plans:
             return {
                 "goal_type": goal_type,
                 "total_plans": 0,
                 "average_metrics": {},
+                "distributions": {},
                 "insights": []
             }
         
-        # Calculate averages
-        total_plans = len(goal_plans)
-        avg_bmi = sum(plan.bmi for plan in goal_plans if plan.bmi) / total_plans
-        avg_calories = sum(plan.daily_calories for plan in goal_plans if plan.daily_calories) / total_plans
-        avg_bmr = sum(plan.bmr for plan in goal_plans if plan.bmr) / total_plans
+        # Averages only count plans where the metric is present
+        avg_bmi = stats['bmi_avg']
+        avg_calories = stats['daily_calories_avg']
+        avg_bmr = stats['bmr_avg']
         
         # Generate insights
         insights = []
         
         if goal_type == "weight-loss":
-            if avg_calories < 2000:
+            if avg_calories is not None and avg_calories < 2000:
                 insights.append("Most users are targeting aggressive calorie deficits")
-            elif avg_calories > 2500:
+            elif avg_calories is not None and avg_calories > 2500:
                 insights.append("Users are taking a more moderate approach to weight loss")
             
-            if avg_bmi > 30:
+            if avg_bmi is not None and avg_bmi > 30:
                 insights.append("Many users are in the obese category, focusing on sustainable weight loss")
         
         elif goal_type == "weight-gain":
-            if avg_calories > 3000:
+            if avg_calories is not None and avg_calories > 3000:
                 insights.append("Users are targeting significant calorie surpluses for muscle gain")
             else:
                 insights.append("Users are taking a conservative approach to weight gain")
         
         elif goal_type == "lean-body":
-            if avg_bmi < 25:
+            if avg_bmi is not None and avg_bmi < 25:
                 insights.append("Most users are already in healthy BMI range")
             insights.append("Users are focusing on body composition rather than weight changes")
         
@@ -151,9 +178,13 @@ async def get_goal_analytics(
             "goal_type": goal_type,
             "total_plans": total_plans,
             "average_metrics": {
-                "bmi": round(avg_bmi, 2),
-                "daily_calories": round(avg_calories, 0),
-                "bmr": round(avg_bmr, 0)
+                "bmi": round(avg_bmi, 2) if avg_bmi is not None else None,
+                "daily_calories": round(avg_calories, 0) if avg_calories is not None else None,
+                "bmr": round(avg_bmr, 0) if avg_bmr is not None else None
+            },
+            "distributions": {
+                "bmi": metric_distribution(stats, 'bmi', BMI_HISTOGRAM_EDGES, 2),
+                "daily_calories": metric_distribution(stats, 'daily_calories', CALORIE_HISTOGRAM_EDGES, 0)
             },
             "insights": insights
         }
@@ -165,55 +196,44 @@ async def get_goal_analytics(
         )
 
 @router.get("/analytics/trends")
-async def get_trends_analytics(db: Session = Depends(get_db)):
+async def get_trends_analytics(
+    window: int = Query(TREND_DAYS, ge=1, le=36500, description="Window length in days"),
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$", description="Bucket size: hour, day, week or month"),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Get trends over time.
+    Get plan counts over time, overall and per goal.
+    
+    Read from the pre-bucketed plan_time_buckets table, so the cost grows
+    with the number of buckets, not plans. The default 30-day daily view is
+    served from the shared analytics snapshot. Series can run to thousands
+    of buckets, so they are encoded directly, skipping jsonable_encoder.
     """
+    if window / BUCKET_DAYS[granularity] > MAX_TREND_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Window too long for {granularity} granularity (max {MAX_TREND_BUCKETS} buckets). Use a coarser granularity."
+        )
+    
     try:
-        # Get plans from last 30 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        # Daily plan generation trend
-        daily_trends = db.query(
-            func.date(HealthPlan.created_at).label('date'),
-            func.count(HealthPlan.id).label('count')
-        ).filter(
-            HealthPlan.created_at >= thirty_days_ago
-        ).group_by(
-            func.date(HealthPlan.created_at)
-        ).order_by(
-            func.date(HealthPlan.created_at)
-        ).all()
-        
-        # Goal trends over time
-        goal_trends = db.query(
-            func.date(HealthPlan.created_at).label('date'),
-            HealthPlan.fitness_goal,
-            func.count(HealthPlan.id).label('count')
-        ).filter(
-            HealthPlan.created_at >= thirty_days_ago
-        ).group_by(
-            func.date(HealthPlan.created_at),
-            HealthPlan.fitness_goal
-        ).order_by(
-            func.date(HealthPlan.created_at)
-        ).all()
-        
-        # Process goal trends
-        goal_trend_data = {}
-        for date, goal, count in goal_trends:
-            if goal not in goal_trend_data:
-                goal_trend_data[goal] = {}
-            goal_trend_data[goal][str(date)] = count
-        
-        return {
-            "daily_trends": [
-                {"date": str(date), "count": count}
-                for date, count in daily_trends
-            ],
-            "goal_trends": goal_trend_data,
-            "period": "last_30_days"
-        }
+        if window == TREND_DAYS and granularity == "day":
+            snapshot = await analytics_snapshot.get()
+            trends, goal_trends = snapshot["trends"], snapshot["goal_trends"]
+            generated_at = snapshot["generated_at"]
+        else:
+            generated_at = datetime.utcnow()
+            trends, goal_trends = trend_series(
+                await read_time_series(db, granularity, generated_at - timedelta(days=window)),
+                granularity
+            )
+        
+        return ORJSONResponse({
+            "trends": trends,
+            "goal_trends": goal_trends,
+            "granularity": granularity,
+            "period": f"last_{window}_days",
+            "generated_at": generated_at
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -222,32 +242,27 @@ async def get_trends_analytics(db: Session = Depends(get_db)):
         )
 
 @router.get("/analytics/insights")
-async def get_insights(db: Session = Depends(get_db)):
+async def get_insights():
     """
     Get AI-generated insights from the data.
+    Served from the shared analytics snapshot, refreshed at most once per TTL.
     """
     try:
         insights = []
+        snapshot = await analytics_snapshot.get()
         
         # Total plans
-        total_plans = db.query(HealthPlan).count()
-        
-        if total_plans == 0:
-            return {"insights": ["No data available for insights"]}
+        if snapshot["total_plans"] == 0:
+            return {"insights": ["No data available for insights"], "generated_at": snapshot["generated_at"]}
         
         # Most popular goal
-        goal_stats = db.query(
-            HealthPlan.fitness_goal,
-            func.count(HealthPlan.id).label('count')
-        ).group_by(HealthPlan.fitness_goal).order_by(
-            desc(func.count(HealthPlan.id))
-        ).first()
-        
-        if goal_stats:
-            insights.append(f"Most popular fitness goal: {goal_stats[0]} ({goal_stats[1]} plans)")
+        goal_distribution = snapshot["goal_distribution"]
+        if goal_distribution:
+            goal, count = max(goal_distribution.items(), key=lambda item: item[1])
+            insights.append(f"Most popular fitness goal: {goal} ({count} plans)")
         
         # Average BMI insight
-        avg_bmi = db.query(func.avg(HealthPlan.bmi)).scalar()
+        avg_bmi = snapshot["average_metrics"]["bmi"]
         if avg_bmi:
             if avg_bmi > 30:
                 insights.append("Average user BMI indicates obesity, suggesting focus on weight loss")
@@ -257,7 +272,7 @@ async def get_insights(db: Session = Depends(get_db)):
                 insights.append("Average user BMI is in healthy range, suggesting focus on maintenance")
         
         # Calorie range insight
-        avg_calories = db.query(func.avg(HealthPlan.daily_calories)).scalar()
+        avg_calories = snapshot["average_metrics"]["daily_calories"]
         if avg_calories:
             if avg_calories < 1800:
                 insights.append("Users are generally targeting aggressive calorie deficits")
@@ -267,9 +282,7 @@ async def get_insights(db: Session = Depends(get_db)):
                 insights.append("Users are generally targeting moderate calorie adjustments")
         
         # Recent activity
-        plans_today = db.query(HealthPlan).filter(
-            func.date(HealthPlan.created_at) == datetime.utcnow().date()
-        ).count()
+        plans_today = snapshot["plans_today"]
         
         if plans_today > 10:
             insights.append("High activity today - users are actively seeking fitness guidance")
@@ -278,10 +291,146 @@ async def get_insights(db: Session = Depends(get_db)):
         else:
             insights.append("No activity today - consider promotional campaigns")
         
-        return {"insights": insights}
+        return {"insights": insights, "generated_at": snapshot["generated_at"]}
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating insights: {str(e)}"
         )
+
+@router.get("/analytics/distributions")
+async def get_distributions(
+    metric: str = Query("bmi", description=f"One of: {', '.join(SKETCH_METRICS)}"),
+    group_by: str = Query("all", description=f"One of: {', '.join(SKETCH_GROUPS)}"),
+    quantiles: str = Query("0.5,0.9,0.95,0.99", description="Comma-separated quantiles between 0 and 1")
+):
+    """
+    Get approximate percentiles of a metric per goal, gender or age group.
+    
+    Answered from in-memory KLL sketches without touching the database.
+    Each returned value has a true rank within about 1.65% of the requested
+    quantile (99% confidence); distinct_profiles is a HyperLogLog estimate
+    with about 1.6% standard error. Deleted plans are still counted.
+    """
+    if metric not in SKETCH_METRICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid metric. Must be one of: {list(SKETCH_METRICS)}"
+        )
+    if group_by not in SKETCH_GROUPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid group_by. Must be one of: {list(SKETCH_GROUPS)}"
+        )
+    try:
+        requested = [float(q) for q in quantiles.split(",") if q.strip()]
+    except ValueError:
+        requested = None
+    if not requested or any(q < 0 or q > 1 for q in requested):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="quantiles must be comma-separated numbers between 0 and 1"
+        )
+    
+    return {
+        "metric": metric,
+        "group_by": group_by,
+        "groups": distribution_sketches.query(metric, group_by, requested),
+        "error_bounds": {
+            "quantile_rank_error": KLL_RANK_ERROR,
+            "distinct_profiles_relative_error": HLL_RELATIVE_ERROR
+        },
+        "persisted_at": distribution_sketches.persisted_at
+    }
+
+def csv_param(value: Optional[str], name: str, allowed: tuple) -> list:
+    """Split a comma-separated query parameter, rejecting unknown entries"""
+    items = [item.strip() for item in (value or "").split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name}: {unknown}. Must be one of: {list(allowed)}"
+        )
+    return items
+
+def month_params(value: Optional[str], name: str) -> list:
+    """Split comma-separated YYYY-MM months, rejecting ones that aren't real months (e.g. 2026-13)"""
+    months = [month.strip() for month in (value or "").split(",") if month.strip()]
+    invalid = []
+    for month in months:
+        try:
+            month_range(month)
+        except ValueError:
+            invalid.append(month)
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name}: {invalid}. Must be YYYY-MM months"
+        )
+    return months
+
+@router.post("/analytics/snapshots", status_code=status.HTTP_202_ACCEPTED)
+async def create_snapshots(
+    background_tasks: BackgroundTasks,
+    months: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}(,\d{4}-\d{2})*$", description="Comma-separated YYYY-MM months (default: all)")
+):
+    """
+    Write health_plans to month-partitioned Arrow IPC files in the background.
+    Without months, every month is rewritten and stale partitions are removed.
+    """
+    requested = month_params(months, "months") or None
+    background_tasks.add_task(write_snapshots, requested)
+    return {"status": "scheduled", "months": requested or "all"}
+
+@router.get("/analytics/snapshots")
+async def list_snapshots():
+    """
+    List the columnar snapshot partitions on disk.
+    """
+    return {"partitions": partition_info()}
+
+@router.get("/analytics/snapshots/query")
+async def query_snapshots(
+    group_by: Optional[str] = Query(None, description=f"Comma-separated columns: {', '.join(GROUP_COLUMNS)}"),
+    metrics: str = Query("bmi,daily_calories", description=f"Comma-separated columns: {', '.join(METRIC_COLUMNS)}"),
+    aggregates: str = Query("mean", description=f"Comma-separated functions: {', '.join(AGGREGATES)}"),
+    from_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="First month (YYYY-MM)"),
+    to_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Last month (YYYY-MM)"),
+    fitness_goal: Optional[str] = Query(None, description="Only plans for this goal")
+):
+    """
+    Run an ad-hoc aggregation over the columnar snapshots.
+    
+    Partitions outside the month range are skipped, the rest are memory-mapped
+    and aggregated with Arrow compute kernels off the event loop. The
+    transactional database is not queried; results are as of each
+    partition's written_at.
+    """
+    month_params(from_month, "from_month")
+    month_params(to_month, "to_month")
+    try:
+        return await query_snapshot(
+            group_by=csv_param(group_by, "group_by", GROUP_COLUMNS),
+            metrics=csv_param(metrics, "metrics", METRIC_COLUMNS),
+            aggregates=csv_param(aggregates, "aggregates", AGGREGATES),
+            from_month=from_month,
+            to_month=to_month,
+            fitness_goal=fitness_goal
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error querying snapshots: {str(e)}"
+        )
+
+@router.get("/analytics/snapshot/stats")
+async def get_snapshot_stats():
+    """
+    Get hit, computation and coalescing counters for the analytics snapshot.
+    """
+    return analytics_snapshot.stats()
@@ -1,124 +1,364 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select
+from typing import List, Optional
+from datetime import datetime
 import json
 
-from app.database import get_db, HealthPlan
-from app.models import UserDataRequest, HealthPlanResponse, Message
+from app.database import get_async_db, get_read_db, HealthPlan
+from app.models import (
+    UserDataRequest, HealthPlanResponse, Message, FitnessGoal, HealthPlanRecord,
+    BatchUserDataRequest, BatchHealthPlanResponse, GoalRecommendations, UTCDateTime
+)
 from app.utils.health_calculator import HealthCalculator
 from app.utils.data import FITNESS_DATA
+from app.utils.plan_cache import plan_cache, hot_plan_cache
+from app.utils.plan_writer import plan_writer, PlanQueueFullError
+from app.utils.plan_export import stream_health_plans, export_query, EXPORT_MEDIA_TYPES
+from app.utils.rollups import apply_rollups, read_rollups, rollup_average
+from app.utils.pagination import keyset_page, split_page, NEXT_CURSOR_HEADER
+from app.utils.sketches import distribution_sketches
+from app.utils.plan_fragments import (
+    plan_fragments, parse_include, plan_metrics, plan_macros, plan_timeline,
+    plan_from_record, record_user_data, encode_json
+)
 
 router = APIRouter()
 
+INCLUDE_DESCRIPTION = (
+    "Comma-separated static sections to return "
+    "(activity_recommendations, timeline_estimates, nutrients, health_tips). "
+    "Omit for all sections, pass an empty value for none."
+)
+
+def include_sections(include: Optional[str]) -> tuple:
+    """Parse ?include=, turning unknown sections into a 400"""
+    try:
+        return parse_include(include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+def stored_plan_entry(health_plan: HealthPlan) -> tuple:
+    """Encode a stored plan once for the hot-plan cache: (user_fields, goal, created_at)"""
+    user_fields = plan_fragments.encode_user_fields(
+        record_user_data(health_plan),
+        plan_from_record(health_plan)
+    )
+    return user_fields, health_plan.fitness_goal, health_plan.created_at
+
+def plan_record(user_data: UserDataRequest, health_plan: dict) -> dict:
+    """Build the health_plans row for a generated plan"""
+    return {
+        "user_id": None,  # Will be linked when user authentication is implemented
+        "age": user_data.age,
+        "gender": user_data.gender.value,
+        "height": user_data.height,
+        "weight": user_data.weight,
+        "activity_level": user_data.activity_level.value,
+        "fitness_goal": user_data.fitness_goal.value,
+        "bmi": health_plan["metrics"]["bmi"]["value"],
+        "bmr": health_plan["metrics"]["bmr"],
+        "tdee": health_plan["metrics"]["tdee"],
+        "daily_calories": health_plan["dailyCalories"],
+        "protein_grams": health_plan["macros"]["protein"]["grams"],
+        "carbs_grams": health_plan["macros"]["carbs"]["grams"],
+        "fat_grams": health_plan["macros"]["fat"]["grams"],
+        "water_intake": health_plan["waterIntake"],
+        "sleep_recommendation": health_plan["sleepRecommendation"],
+        "created_at": datetime.utcnow()
+    }
+
 @router.post("/health-plans/generate", response_model=HealthPlanResponse, status_code=status.HTTP_201_CREATED)
 async def generate_health_plan(
     user_data: UserDataRequest,
-    db: Session = Depends(get_db)
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate a personalized health plan based on user input.
     
     This endpoint calculates BMI, BMR, TDEE, and provides comprehensive
     recommendations for nutrition, exercise, and lifestyle.
+    
+    Goal-specific and general sections are pre-serialized at startup and
+    spliced into the response next to the per-user fields. Input is checked
+    once, by UserDataRequest's constraints.
     """
+    sections = include_sections(include)
+    
     try:
-        # Initialize health calculator
-        calculator = HealthCalculator()
+        # Serve repeat inputs from the plan cache
+        fields = user_data.model_dump()
+        cache_key = plan_cache.key_for(fields)
+        cached = plan_cache.get(cache_key)
         
-        # Generate health plan
-        health_plan = calculator.generate_health_plan(user_data.dict())
+        if cached is None:
+            # Initialize health calculator
+            calculator = HealthCalculator()
+            
+            # Generate health plan
+            health_plan = calculator.generate_health_plan(fields, validated=True)
+            user_fields = plan_fragments.encode_user_fields(user_data.model_dump(mode="json"), health_plan)
+            plan_cache.set(cache_key, (health_plan, user_fields))
+        else:
+            health_plan, user_fields = cached
         
         # Save to database (optional - for analytics)
-        db_health_plan = HealthPlan(
-            user_id=None,  # Will be linked when user authentication is implemented
-            age=user_data.age,
-            gender=user_data.gender,
-            height=user_data.height,
-            weight=user_data.weight,
-            activity_level=user_data.activity_level,
-            fitness_goal=user_data.fitness_goal,
-            bmi=health_plan["metrics"]["bmi"]["value"],
-            bmr=health_plan["metrics"]["bmr"],
-            tdee=health_plan["metrics"]["tdee"],
-            daily_calories=health_plan["dailyCalories"],
-            protein_grams=health_plan["macros"]["protein"]["grams"],
-            carbs_grams=health_plan["macros"]["carbs"]["grams"],
-            fat_grams=health_plan["macros"]["fat"]["grams"],
-            water_intake=health_plan["waterIntake"],
-            sleep_recommendation=health_plan["sleepRecommendation"]
+        if plan_writer.enabled:
+            await plan_writer.enqueue(plan_record(user_data, health_plan))
+        else:
+            record = plan_record(user_data, health_plan)
+            
+            db.add(HealthPlan(**record))
+            await apply_rollups(db, [record])
+            await db.commit()
+            distribution_sketches.add_plans([record])
+        
+        return Response(
+            content=plan_fragments.render(
+                user_fields,
+                user_data.fitness_goal.value,
+                datetime.utcnow(),
+                sections
+            ),
+            media_type="application/json",
+            status_code=status.HTTP_201_CREATED
         )
         
-        db.add(db_health_plan)
-        db.commit()
-        db.refresh(db_health_plan)
+    except PlanQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating health plan: {str(e)}"
+        )
+
+@router.post("/health-plans/generate/batch", response_model=BatchHealthPlanResponse, status_code=status.HTTP_201_CREATED)
+async def generate_health_plans_batch(
+    batch: BatchUserDataRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Generate health plans for a whole cohort in one request.
+    
+    Metrics for every row are computed in a single vectorized pass and the
+    batch is stored with one bulk insert. Goal-specific recommendations are
+    returned once per goal instead of being repeated on every plan. Plans
+    are encoded straight from the calculator output; only the per-goal
+    sections go through their models.
+    """
+    try:
+        calculator = HealthCalculator()
+        health_plans = calculator.generate_health_plans([user.model_dump() for user in batch.users], validated=True)
         
-        return HealthPlanResponse(
-            user_data=user_data,
-            metrics=health_plan["metrics"],
-            daily_calories=health_plan["dailyCalories"],
-            macros=health_plan["macros"],
-            water_intake=health_plan["waterIntake"],
-            sleep_recommendation=health_plan["sleepRecommendation"],
-            activity_recommendations=health_plan["activityRecommendations"],
-            timeline_estimates=health_plan["timelineEstimates"],
-            nutrients=health_plan["nutrients"],
-            health_tips=health_plan["healthTips"]
+        # Save to database with a single bulk insert (optional - for analytics)
+        records = [plan_record(user, plan) for user, plan in zip(batch.users, health_plans)]
+        await db.execute(insert(HealthPlan), records)
+        await apply_rollups(db, records)
+        await db.commit()
+        distribution_sketches.add_plans(records)
+        
+        goals = {user.fitness_goal.value for user in batch.users}
+        
+        return ORJSONResponse(
+            {
+                "total_plans": len(health_plans),
+                "plans": [
+                    {
+                        "user_data": user.model_dump(mode="json"),
+                        "metrics": plan_metrics(plan),
+                        "daily_calories": plan["dailyCalories"],
+                        "macros": plan_macros(plan),
+                        "water_intake": plan["waterIntake"],
+                        "sleep_recommendation": plan["sleepRecommendation"]
+                    }
+                    for user, plan in zip(batch.users, health_plans)
+                ],
+                "goal_recommendations": {
+                    goal: GoalRecommendations(
+                        activity_recommendations=calculator.get_activity_recommendations(goal),
+                        timeline_estimates=plan_timeline(calculator.get_timeline_estimates(goal))
+                    ).model_dump(mode="json")
+                    for goal in goals
+                },
+                "created_at": datetime.utcnow()
+            },
+            status_code=status.HTTP_201_CREATED
         )
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating health plan: {str(e)}"
+            detail=f"Error generating health plans: {str(e)}"
         )
 
-@router.get("/health-plans", response_model=List[HealthPlanResponse])
+@router.get("/health-plans/cache/stats")
+async def get_plan_cache_stats():
+    """
+    Get hit, miss and eviction counters for the generated and stored plan caches.
+    """
+    return {
+        "generated_plans": plan_cache.stats(),
+        "stored_plans": hot_plan_cache.stats()
+    }
+
+@router.get("/health-plans/write-queue/stats")
+async def get_plan_write_queue_stats():
+    """
+    Get queue depth and flush latency for write-behind persistence.
+    """
+    return plan_writer.stats()
+
+@router.get("/health-plans/export")
+async def export_health_plans(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: ndjson or csv"),
+    created_from: Optional[UTCDateTime] = Query(None, description="Only plans created at or after this time"),
+    created_to: Optional[UTCDateTime] = Query(None, description="Only plans created before this time"),
+    fitness_goal: Optional[FitnessGoal] = Query(None, description="Only plans for this fitness goal")
+):
+    """
+    Stream stored health plans for offline analysis.
+    
+    Rows are read through a server-side cursor and written out as they
+    arrive, so memory use stays flat regardless of export size.
+    """
+    query = export_query(
+        created_from=created_from,
+        created_to=created_to,
+        fitness_goal=fitness_goal.value if fitness_goal else None
+    )
+    
+    return StreamingResponse(
+        stream_health_plans(query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="health_plans.{format}"'}
+    )
+
+@router.get("/health-plans", response_model=List[HealthPlanRecord])
 async def get_health_plans(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Retrieve health plans from the database.
+    Retrieve stored health plans from the database.
+    
+    Pages are ordered by (created_at, id). The cursor for the following
+    page is returned in the X-Next-Cursor header (absent on the last page);
+    pass it back as cursor. skip is only used when no cursor is given.
+    Rows are encoded directly rather than validated against HealthPlanRecord.
     This endpoint will be enhanced with user authentication.
     """
-    health_plans = db.query(HealthPlan).offset(skip).limit(limit).all()
+    try:
+        query = keyset_page(select(HealthPlan), HealthPlan, limit, cursor=cursor, skip=skip)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    health_plans, next_cursor = split_page((await db.scalars(query)).all(), limit)
     
-    # Convert database records to response models
-    # This is a simplified version - in production, you'd want proper user linking
-    return []
+    return ORJSONResponse(
+        [{column: getattr(plan, column) for column in HealthPlanRecord.model_fields} for plan in health_plans],
+        headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
+
+@router.get("/health-plans/multi")
+async def get_health_plans_multi(
+    ids: List[int] = Query(..., description="Health plan IDs (repeat the parameter, up to 1000)"),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Retrieve many stored health plans at once.
+    
+    Plans missing from the hot-plan cache are loaded with a single query.
+    Plans are returned in request order; unknown IDs are listed in missing.
+    """
+    if len(ids) > 1000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At most 1000 IDs can be requested at once"
+        )
+    sections = include_sections(include)
+    
+    entries = {}
+    for plan_id in dict.fromkeys(ids):
+        entry = hot_plan_cache.get(plan_id)
+        if entry is not None:
+            entries[plan_id] = entry
+    
+    to_load = [plan_id for plan_id in dict.fromkeys(ids) if plan_id not in entries]
+    if to_load:
+        health_plans = await db.scalars(select(HealthPlan).where(HealthPlan.id.in_(to_load)))
+        for health_plan in health_plans:
+            entry = stored_plan_entry(health_plan)
+            hot_plan_cache.set(health_plan.id, entry)
+            entries[health_plan.id] = entry
+    
+    bodies = [
+        plan_fragments.render(*entries[plan_id], sections)
+        for plan_id in ids if plan_id in entries
+    ]
+    missing = [plan_id for plan_id in dict.fromkeys(ids) if plan_id not in entries]
+    
+    return Response(
+        content=b'{"plans":[' + b",".join(bodies) + b'],"missing":' + encode_json(missing) + b"}",
+        media_type="application/json"
+    )
 
 @router.get("/health-plans/{plan_id}", response_model=HealthPlanResponse)
 async def get_health_plan(
     plan_id: int,
-    db: Session = Depends(get_db)
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Retrieve a specific health plan by ID.
+    
+    The plan is rebuilt from its stored metrics plus the goal's static
+    content, without recalculating anything, and kept in the hot-plan cache
+    for up to HOT_PLAN_CACHE_TTL seconds.
     """
-    health_plan = db.query(HealthPlan).filter(HealthPlan.id == plan_id).first()
+    sections = include_sections(include)
     
-    if not health_plan:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Health plan not found"
-        )
+    entry = hot_plan_cache.get(plan_id)
+    if entry is None:
+        health_plan = await db.get(HealthPlan, plan_id)
+        
+        if not health_plan:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Health plan not found"
+            )
+        
+        entry = stored_plan_entry(health_plan)
+        hot_plan_cache.set(plan_id, entry)
     
-    # Convert database record to response model
-    # This would require reconstructing the full plan from stored data
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Retrieving stored health plans not yet implemented"
+    return Response(
+        content=plan_fragments.render(*entry, sections),
+        media_type="application/json"
     )
 
 @router.delete("/health-plans/{plan_id}", response_model=Message)
 async def delete_health_plan(
     plan_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a health plan by ID.
     """
-    health_plan = db.query(HealthPlan).filter(HealthPlan.id == plan_id).first()
+    health_plan = await db.get(HealthPlan, plan_id)
     
     if not health_plan:
         raise HTTPException(
@@ -126,31 +366,28 @@ async def delete_health_plan(
             detail="Health plan not found"
         )
     
-    db.delete(health_plan)
-    db.commit()
+    await db.delete(health_plan)
+    await apply_rollups(db, [health_plan], sign=-1)
+    await db.commit()
+    hot_plan_cache.invalidate(plan_id)
     
     return Message(message="Health plan deleted successfully")
 
 @router.get("/health-plans/analytics/summary")
-async def get_health_plans_analytics(db: Session = Depends(get_db)):
+async def get_health_plans_analytics(db: AsyncSession = Depends(get_read_db)):
     """
     Get analytics summary of generated health plans.
+    Served from the analytics rollups, so cost does not grow with the table.
     """
-    total_plans = db.query(HealthPlan).count()
-    
-    # Get goal distribution
-    goals = db.query(HealthPlan.fitness_goal).all()
-    goal_distribution = {}
-    for goal in goals:
-        goal_distribution[goal[0]] = goal_distribution.get(goal[0], 0) + 1
+    rollups = await read_rollups(db, days=1)
+    total = rollups.get("total", {}).get("")
     
-    # Get average metrics
-    avg_bmi = db.query(HealthPlan.bmi).filter(HealthPlan.bmi.isnot(None)).scalar()
-    avg_calories = db.query(HealthPlan.daily_calories).filter(HealthPlan.daily_calories.isnot(None)).scalar()
+    avg_bmi = rollup_average(total, "bmi")
+    avg_calories = rollup_average(total, "daily_calories")
     
     return {
-        "total_plans_generated": total_plans,
-        "goal_distribution": goal_distribution,
+        "total_plans_generated": total.plan_count if total else 0,
+        "goal_distribution": {goal: row.plan_count for goal, row in rollups.get("goal", {}).items()},
         "average_bmi": round(avg_bmi, 2) if avg_bmi else None,
         "average_daily_calories": round(avg_calories, 0) if avg_calories else None
     }
@@ -0,0 +1,192 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select, func
+from typing import Optional
+from datetime import datetime
+
+from app.database import get_async_db, get_read_db, User, UserProgress, ProgressRollup
+from app.models import (
+    ProgressBatchRequest, ProgressBatchResponse, ProgressResponse, ProgressPage,
+    ProgressHistory, ProgressPoint, UTCDateTime
+)
+from app.utils.pagination import keyset_page, split_page
+from app.utils.progress_history import apply_progress_rollups, downsample
+from app.utils.rollups import bucket_start
+
+router = APIRouter()
+
+# Most raw entries /history will load to downsample; longer ranges use rollups
+MAX_RAW_HISTORY_ENTRIES = 20000
+
+def progress_fields(row) -> dict:
+    """ProgressResponse fields of a user_progress row, serialized as-is without re-validation"""
+    return {field: getattr(row, field) for field in ProgressResponse.model_fields}
+
+def point_fields(point: dict) -> dict:
+    """ProgressPoint fields of a history point; raw entries take the defaults for rollup-only fields"""
+    return {field: point.get(field, info.default) for field, info in ProgressPoint.model_fields.items()}
+
+@router.post("/progress/{user_id}/batch", response_model=ProgressBatchResponse, status_code=status.HTTP_201_CREATED)
+async def record_progress_batch(
+    user_id: int,
+    batch: ProgressBatchRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Record many progress entries for a user at once, e.g. weigh-ins synced
+    after being offline. All entries are stored with a single INSERT.
+    """
+    if await db.get(User, user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    now = datetime.utcnow()
+    entries = [
+        {
+            "user_id": user_id,
+            "current_weight": entry.current_weight,
+            "current_height": entry.current_height,
+            "notes": entry.notes,
+            "recorded_at": entry.recorded_at or now
+        }
+        for entry in batch.entries
+    ]
+    rows = (await db.execute(
+        insert(UserProgress).returning(UserProgress, sort_by_parameter_order=True),
+        entries
+    )).scalars().all()
+    await apply_progress_rollups(db, entries)
+    await db.commit()
+
+    return ORJSONResponse(
+        {
+            "user_id": user_id,
+            "inserted": len(rows),
+            "entries": [progress_fields(row) for row in rows]
+        },
+        status_code=status.HTTP_201_CREATED
+    )
+
+async def raw_history(db, user_id: int, recorded_from, recorded_to) -> list:
+    query = select(UserProgress.recorded_at, UserProgress.current_weight).where(
+        UserProgress.user_id == user_id,
+        UserProgress.current_weight.isnot(None)
+    )
+    if recorded_from is not None:
+        query = query.where(UserProgress.recorded_at >= recorded_from)
+    if recorded_to is not None:
+        query = query.where(UserProgress.recorded_at < recorded_to)
+    rows = await db.execute(query.order_by(UserProgress.recorded_at, UserProgress.id))
+    return [{"recorded_at": recorded_at, "weight": weight} for recorded_at, weight in rows]
+
+async def rollup_history(db, user_id: int, granularity: str, recorded_from, recorded_to) -> list:
+    query = select(ProgressRollup).where(
+        ProgressRollup.user_id == user_id,
+        ProgressRollup.granularity == granularity
+    )
+    if recorded_from is not None:
+        query = query.where(ProgressRollup.bucket_start >= bucket_start(recorded_from, granularity))
+    if recorded_to is not None:
+        query = query.where(ProgressRollup.bucket_start < recorded_to)
+    rows = await db.scalars(query.order_by(ProgressRollup.bucket_start))
+    return [
+        {
+            "recorded_at": row.bucket_start,
+            "weight": row.weight_sum / row.entry_count,
+            "min_weight": row.weight_min,
+            "max_weight": row.weight_max,
+            "entries": row.entry_count
+        }
+        for row in rows
+    ]
+
+@router.get("/progress/{user_id}/history", response_model=ProgressHistory)
+async def get_progress_history(
+    user_id: int,
+    points: int = Query(500, ge=10, le=5000, description="Maximum number of points to return"),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$", description="Downsampling method: lttb or minmax"),
+    resolution: str = Query("auto", pattern="^(auto|raw|week|month)$", description="auto, raw, week or month"),
+    recorded_from: Optional[UTCDateTime] = Query(None, description="Only entries recorded at or after this time"),
+    recorded_to: Optional[UTCDateTime] = Query(None, description="Only entries recorded before this time"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get a user's weight history sized for charting.
+    
+    With resolution=auto, raw entries are returned when they fit the point
+    budget and downsampled when there are up to 20000 of them; longer
+    histories are read from the weekly or, failing that, monthly rollups.
+    Any series over budget is reduced with LTTB (shape-preserving) or
+    min/max buckets (keeps every extreme).
+    """
+    series = None
+    if resolution == "auto":
+        count_query = select(func.count()).select_from(UserProgress).where(UserProgress.user_id == user_id)
+        if recorded_from is not None:
+            count_query = count_query.where(UserProgress.recorded_at >= recorded_from)
+        if recorded_to is not None:
+            count_query = count_query.where(UserProgress.recorded_at < recorded_to)
+
+        if await db.scalar(count_query) <= MAX_RAW_HISTORY_ENTRIES:
+            resolution = "raw"
+        else:
+            resolution = "week"
+            series = await rollup_history(db, user_id, "week", recorded_from, recorded_to)
+            if len(series) > points:
+                resolution = "month"
+                series = None
+
+    if series is None:
+        if resolution == "raw":
+            series = await raw_history(db, user_id, recorded_from, recorded_to)
+        else:
+            series = await rollup_history(db, user_id, resolution, recorded_from, recorded_to)
+
+    sampled = downsample(series, points, method)
+
+    return ORJSONResponse({
+        "user_id": user_id,
+        "resolution": resolution,
+        "method": method if len(sampled) < len(series) else None,
+        "source_points": len(series),
+        "points": [point_fields(point) for point in sampled]
+    })
+
+@router.get("/progress/{user_id}", response_model=ProgressPage)
+async def get_progress(
+    user_id: int,
+    recorded_from: Optional[UTCDateTime] = Query(None, description="Only entries recorded at or after this time"),
+    recorded_to: Optional[UTCDateTime] = Query(None, description="Only entries recorded before this time"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Retrieve a user's progress history, oldest first.
+
+    Reads are a range scan of the (user_id, recorded_at, id) index. Pass
+    next_cursor back as cursor to fetch the following page.
+    """
+    query = select(UserProgress).where(UserProgress.user_id == user_id)
+    if recorded_from is not None:
+        query = query.where(UserProgress.recorded_at >= recorded_from)
+    if recorded_to is not None:
+        query = query.where(UserProgress.recorded_at < recorded_to)
+
+    try:
+        query = keyset_page(query, UserProgress, limit, cursor=cursor, order_by="recorded_at")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    entries, next_cursor = split_page((await db.scalars(query)).all(), limit, order_by="recorded_at")
+
+    return ORJSONResponse({
+        "items": [progress_fields(entry) for entry in entries],
+        "next_cursor": next_cursor
+    })
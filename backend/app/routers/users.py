@@ -1,35 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from passlib.context import CryptContext
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.database import get_db, User
+from app.database import get_async_db, get_read_db, User
 from app.models import UserCreate, UserResponse, UserLogin, Token, Message
+from app.utils.pagination import keyset_page, split_page, NEXT_CURSOR_HEADER
+from app.utils.password_hasher import password_hasher, HasherBusyError
+from app.utils.user_import import UserImport, iter_lines, iter_records
+from app.utils.auth import create_access_token, get_token_claims, token_revocations, verified_tokens
 
 router = APIRouter()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def user_fields(user) -> dict:
+    """UserResponse fields of a users row, serialized as-is without re-validation"""
+    return {field: getattr(user, field) for field in UserResponse.model_fields}
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def run_hasher(operation, *args):
+    """Run a password_hasher operation, answering 503 when the hasher is saturated"""
+    try:
+        return await operation(*args)
+    except HasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
 
 @router.post("/users/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user account.
     """
     # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
+    existing_user = await db.scalar(
+        select(User).where((User.email == user.email) | (User.username == user.username))
+    )
     
     if existing_user:
         raise HTTPException(
@@ -38,7 +49,7 @@ async def register_user(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_hasher(password_hasher.hash, user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -46,8 +57,8 @@ async def register_user(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return UserResponse(
         id=db_user.id,
@@ -57,18 +68,50 @@ async def register_user(
         created_at=db_user.created_at
     )
 
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Body format: ndjson or csv (with a header row)"),
+    chunk_size: int = Query(500, ge=1, le=5000, description="Records validated, checked and inserted together")
+):
+    """
+    Bulk-import users from a streamed CSV or NDJSON request body.
+    
+    Each record needs email, username and password. The body is read as it
+    arrives and processed chunk_size records at a time (capped at the
+    password hasher's queue limit) with one uniqueness query, parallel
+    password hashing and one bulk insert per chunk. Hashing runs on the
+    hasher's bulk pool, separate from the workers serving logins and
+    registrations. Quoted CSV fields may span lines. Bad rows are reported
+    by row number and skipped; the rest are imported.
+    """
+    user_import = UserImport(password_hasher, chunk_size=chunk_size)
+    try:
+        return await user_import.run(iter_records(iter_lines(request.stream()), format))
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Import stopped after {user_import.imported} users: body is not UTF-8 ({str(e)})"
+        )
+    except HasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Import stopped after {user_import.imported} users: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+
 @router.post("/users/login", response_model=Token)
 async def login_user(
     user_credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login user and return access token.
     """
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == user_credentials.email))
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await run_hasher(password_hasher.verify, user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -80,56 +123,94 @@ async def login_user(
             detail="User account is deactivated"
         )
     
-    # Generate access token (simplified - in production, use proper JWT)
-    access_token = f"token_{user.id}_{datetime.utcnow().timestamp()}"
+    # Generate signed access token
+    access_token, _ = create_access_token(user)
     
     return Token(access_token=access_token, token_type="bearer")
 
+@router.post("/users/logout", response_model=Message)
+async def logout_user(
+    claims: dict = Depends(get_token_claims)
+):
+    """
+    Revoke the access token used for this request.
+    """
+    token_revocations.revoke_token(claims["jti"], claims["exp"])
+    return Message(message="Logged out successfully")
+
 @router.get("/users/me", response_model=UserResponse)
 async def get_current_user(
-    db: Session = Depends(get_db)
+    claims: dict = Depends(get_token_claims)
 ):
     """
     Get current user information.
-    This endpoint will be enhanced with proper authentication middleware.
+    Served from the verified token's claims without a database lookup.
     """
-    # For now, return a placeholder - in production, extract user from JWT token
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="User authentication not yet implemented"
+    return UserResponse(
+        id=int(claims["sub"]),
+        email=claims["email"],
+        username=claims["username"],
+        is_active=claims["is_active"],
+        created_at=datetime.fromisoformat(claims["created_at"])
     )
 
+@router.get("/users/auth/stats")
+async def get_auth_stats():
+    """
+    Get verified-token cache and revocation list counters.
+    """
+    return {
+        "verified_tokens": verified_tokens.stats(),
+        "revocations": token_revocations.stats()
+    }
+
+@router.get("/users/password-hasher/stats")
+async def get_password_hasher_stats():
+    """
+    Get concurrency and queue-time metrics for password hashing.
+    """
+    return password_hasher.stats()
+
 @router.get("/users", response_model=List[UserResponse])
 async def get_users(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Retrieve all users (admin only).
-    """
-    users = db.query(User).offset(skip).limit(limit).all()
     
-    return [
-        UserResponse(
-            id=user.id,
-            email=user.email,
-            username=user.username,
-            is_active=user.is_active,
-            created_at=user.created_at
+    Pages are ordered by (created_at, id). The cursor for the following
+    page is returned in the X-Next-Cursor header (absent on the last page);
+    pass it back as cursor. skip is only used when no cursor is given.
+    Rows come straight from the table, so the page is encoded directly
+    instead of being validated against UserResponse again.
+    """
+    try:
+        query = keyset_page(select(User), User, limit, cursor=cursor, skip=skip)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        for user in users
-    ]
+    
+    users, next_cursor = split_page((await db.scalars(query)).all(), limit)
+    
+    return ORJSONResponse(
+        [user_fields(user) for user in users],
+        headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
 
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Retrieve a specific user by ID.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -149,12 +230,12 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_update: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update user information.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -163,9 +244,12 @@ async def update_user(
         )
     
     # Check if new email/username already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_update.email) | (User.username == user_update.username)
-    ).filter(User.id != user_id).first()
+    existing_user = await db.scalar(
+        select(User).where(
+            (User.email == user_update.email) | (User.username == user_update.username),
+            User.id != user_id
+        )
+    )
     
     if existing_user:
         raise HTTPException(
@@ -176,11 +260,14 @@ async def update_user(
     # Update user
     user.email = user_update.email
     user.username = user_update.username
-    user.hashed_password = get_password_hash(user_update.password)
+    user.hashed_password = await run_hasher(password_hasher.hash, user_update.password)
     user.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    
+    # Tokens carry the old profile and were issued for the old password
+    token_revocations.revoke_user(user.id)
     
     return UserResponse(
         id=user.id,
@@ -193,12 +280,12 @@ async def update_user(
 @router.delete("/users/{user_id}", response_model=Message)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a user account.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -206,7 +293,8 @@ async def delete_user(
             detail="User not found"
         )
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    token_revocations.revoke_user(user_id)
     
     return Message(message="User deleted successfully")
@@ -0,0 +1,122 @@
+"""
+Analytics Snapshot for FastAPI Backend
+One shared, TTL-cached computation behind the overview, insights and trends endpoints
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from app.database import AsyncSessionLocal, read_replica
+from app.utils.rollups import read_rollups, read_time_series, rollup_average
+
+TREND_DAYS = 30
+
+def trend_series(rows: list, granularity: str) -> tuple:
+    """Fold time series rows into overall and per-goal counts keyed by bucket label"""
+    totals = {}
+    goal_trends = {}
+    for start, goal, count in rows:
+        label = start.isoformat() if granularity == "hour" else start.date().isoformat()
+        totals[label] = totals.get(label, 0) + count
+        goal_trends.setdefault(goal, {})[label] = count
+    return [{"bucket": label, "count": count} for label, count in totals.items()], goal_trends
+
+async def compute_snapshot(db) -> dict:
+    """
+    Compute every fact the dashboard endpoints share.
+
+    Counters, distributions and averages come from one rollup read; daily
+    trends come from one range read of the pre-bucketed time series.
+    """
+    generated_at = datetime.utcnow()
+    rollups = await read_rollups(db, days=7)
+    total = rollups.get("total", {}).get("")
+    daily = rollups.get("day", {})
+    today = generated_at.date().isoformat()
+
+    trends, goal_trends = trend_series(
+        await read_time_series(db, "day", generated_at - timedelta(days=TREND_DAYS)),
+        "day"
+    )
+
+    return {
+        "generated_at": generated_at,
+        "total_plans": total.plan_count if total else 0,
+        "plans_today": daily[today].plan_count if today in daily else 0,
+        "plans_this_week": sum(row.plan_count for row in daily.values()),
+        "goal_distribution": {goal: row.plan_count for goal, row in rollups.get("goal", {}).items()},
+        "gender_distribution": {gender: row.plan_count for gender, row in rollups.get("gender", {}).items()},
+        "age_distribution": {age_group: row.plan_count for age_group, row in rollups.get("age_group", {}).items()},
+        "average_metrics": {
+            "bmi": rollup_average(total, "bmi"),
+            "daily_calories": rollup_average(total, "daily_calories"),
+            "bmr": rollup_average(total, "bmr")
+        },
+        "trends": trends,
+        "goal_trends": goal_trends
+    }
+
+class AnalyticsSnapshotService:
+    """
+    Serves a cached analytics snapshot, recomputing it at most once per ttl.
+
+    Concurrent requests that find the snapshot stale share a single
+    computation (single-flight) instead of each running the queries.
+    """
+
+    def __init__(self, ttl: float = 30.0, session_factory=AsyncSessionLocal):
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self._snapshot = None
+        self._computed_at = None
+        self._inflight = None
+
+        self.hits = 0
+        self.computations = 0
+        self.coalesced = 0
+
+    async def get(self) -> dict:
+        """Return a snapshot no older than ttl seconds"""
+        if self._snapshot is not None and time.monotonic() - self._computed_at < self.ttl:
+            self.hits += 1
+            return self._snapshot
+
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+        else:
+            self.coalesced += 1
+
+        # Shield so a cancelled request doesn't cancel the shared computation
+        return await asyncio.shield(self._inflight)
+
+    def invalidate(self):
+        """Force the next request to recompute"""
+        self._snapshot = None
+
+    async def _refresh(self) -> dict:
+        try:
+            async with self.session_factory() as db:
+                snapshot = await compute_snapshot(db)
+            self._snapshot = snapshot
+            self._computed_at = time.monotonic()
+            self.computations += 1
+            return snapshot
+        finally:
+            self._inflight = None
+
+    def stats(self) -> dict:
+        """Get snapshot cache counters"""
+        return {
+            "ttl_seconds": self.ttl,
+            "generated_at": self._snapshot["generated_at"] if self._snapshot else None,
+            "hits": self.hits,
+            "computations": self.computations,
+            "coalesced": self.coalesced
+        }
+
+analytics_snapshot = AnalyticsSnapshotService(
+    ttl=float(os.getenv("ANALYTICS_SNAPSHOT_TTL", "30")),
+    session_factory=read_replica.session
+)
@@ -0,0 +1,149 @@
+"""
+Authentication for FastAPI Backend
+Signed JWT access tokens verified without a database lookup
+"""
+
+import logging
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from app.database import DATABASE_PROFILE
+from app.utils.plan_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Required outside the dev profile. In dev a random per-process key is used,
+# so tokens don't survive a restart and aren't shared between workers.
+SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+if not SECRET_KEY:
+    if DATABASE_PROFILE != "dev":
+        raise RuntimeError(f"JWT_SECRET_KEY must be set when DATABASE_PROFILE is {DATABASE_PROFILE}")
+    SECRET_KEY = secrets.token_urlsafe(32)
+    logger.warning("JWT_SECRET_KEY is not set; signing tokens with a random per-process key")
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+def create_access_token(user) -> tuple:
+    """
+    Sign an access token for a user. The claims carry everything /users/me
+    returns, so serving it needs no database lookup. Returns (token, claims).
+    """
+    # python-jose pulls in cryptography; import it on first use, not at startup
+    from jose import jwt
+
+    # Fractional iat so a token issued right after a revocation stays valid
+    issued_at = time.time()
+    claims = {
+        "sub": str(user.id),
+        "email": user.email,
+        "username": user.username,
+        "is_active": user.is_active,
+        "created_at": user.created_at.isoformat(),
+        "jti": uuid.uuid4().hex,
+        "iat": issued_at,
+        "exp": int(issued_at) + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM), claims
+
+class TokenRevocations:
+    """
+    In-memory revocation list: single tokens by jti (logout) and every token
+    a user was issued up to a point in time (password change, deletion).
+    Entries are dropped once the tokens they cover have expired anyway.
+    Each worker process keeps its own list.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def revoke_token(self, jti: str, expires_at: int):
+        with self._lock:
+            self._prune()
+            self._tokens[jti] = expires_at
+
+    def revoke_user(self, user_id: int):
+        """Revoke every token issued to the user so far"""
+        with self._lock:
+            self._prune()
+            self._users[str(user_id)] = time.time()
+
+    def is_revoked(self, claims: dict) -> bool:
+        if claims["jti"] in self._tokens:
+            return True
+        revoked_at = self._users.get(claims["sub"])
+        return revoked_at is not None and claims["iat"] <= revoked_at
+
+    def _prune(self):
+        now = time.time()
+        self._tokens = {jti: expires_at for jti, expires_at in self._tokens.items() if expires_at > now}
+        cutoff = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self._users = {user_id: revoked_at for user_id, revoked_at in self._users.items() if revoked_at > cutoff}
+
+    def stats(self) -> dict:
+        return {"revoked_tokens": len(self._tokens), "revoked_users": len(self._users)}
+
+token_revocations = TokenRevocations()
+
+# Tokens whose signature has already been checked, mapped to their claims
+verified_tokens = LRUCache(
+    maxsize=int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+)
+
+def verify_access_token(token: str) -> dict:
+    """
+    Return the claims of a valid token, or raise ValueError.
+
+    The signature is checked once per token; later requests only compare
+    the expiry and consult the revocation list, all in memory.
+    """
+    claims = verified_tokens.get(token)
+    if claims is None:
+        from jose import jwt, JWTError
+
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            raise ValueError(str(e))
+        verified_tokens.set(token, claims)
+    elif claims["exp"] <= time.time():
+        verified_tokens.invalidate(token)
+        raise ValueError("Signature has expired.")
+
+    if token_revocations.is_revoked(claims):
+        raise ValueError("Token has been revoked")
+    return claims
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+) -> dict:
+    """Dependency: claims of the request's bearer token, or 401"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        claims = verify_access_token(credentials.credentials)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid token: {str(e)}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if not claims.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User account is deactivated"
+        )
+    return claims
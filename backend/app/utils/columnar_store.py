@@ -0,0 +1,219 @@
+"""
+Columnar Store for FastAPI Backend
+Month-partitioned Arrow IPC snapshots of health_plans and ad-hoc aggregations over them
+"""
+
+import asyncio
+import glob
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, PlanTimeBucket
+from app.utils.plan_export import export_query, EXPORT_COLUMNS
+
+# pyarrow is imported on first use rather than when the API starts
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+SNAPSHOT_DIR = os.getenv("PLAN_SNAPSHOT_DIR", "./snapshots/health_plans")
+
+@lru_cache(maxsize=None)
+def snapshot_schema() -> "pa.Schema":
+    """Arrow schema of a partition"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("age", pa.int64()),
+        ("gender", pa.string()),
+        ("height", pa.float64()),
+        ("weight", pa.float64()),
+        ("activity_level", pa.string()),
+        ("fitness_goal", pa.string()),
+        ("bmi", pa.float64()),
+        ("bmr", pa.float64()),
+        ("tdee", pa.float64()),
+        ("daily_calories", pa.int64()),
+        ("protein_grams", pa.int64()),
+        ("carbs_grams", pa.int64()),
+        ("fat_grams", pa.int64()),
+        ("water_intake", pa.string()),
+        ("sleep_recommendation", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("month", pa.dictionary(pa.int8(), pa.string()))
+    ])
+
+# Columns ad-hoc queries may group by or aggregate
+GROUP_COLUMNS = ("fitness_goal", "gender", "activity_level", "month")
+METRIC_COLUMNS = ("age", "height", "weight", "bmi", "bmr", "tdee", "daily_calories", "protein_grams", "carbs_grams", "fat_grams")
+AGGREGATES = ("count", "sum", "mean", "min", "max", "stddev", "approximate_median")
+
+def month_range(month: str) -> tuple:
+    """[start, end) datetimes of a YYYY-MM month"""
+    start = datetime.strptime(month, "%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+def partition_path(month: str, directory: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(directory, f"month={month}.arrow")
+
+def list_partitions(directory: str = SNAPSHOT_DIR) -> list:
+    """Snapshot months on disk, oldest first"""
+    paths = glob.glob(os.path.join(directory, "month=*.arrow"))
+    return sorted(os.path.basename(path)[len("month="):-len(".arrow")] for path in paths)
+
+def partition_info(directory: str = SNAPSHOT_DIR) -> list:
+    """Month, row count, size and write time of every partition"""
+    import pyarrow as pa
+
+    partitions = []
+    for month in list_partitions(directory):
+        path = partition_path(month, directory)
+        with pa.memory_map(path, "r") as source:
+            rows = pa.ipc.open_file(source).read_all().num_rows
+        partitions.append({
+            "month": month,
+            "rows": rows,
+            "size_bytes": os.path.getsize(path),
+            "written_at": datetime.utcfromtimestamp(os.path.getmtime(path))
+        })
+    return partitions
+
+def _record_batch(rows, month: str) -> "pa.RecordBatch":
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    arrays = [
+        pa.array(values, type=snapshot_schema().field(name).type)
+        for name, values in zip(EXPORT_COLUMNS, columns)
+    ]
+    arrays.append(pa.DictionaryArray.from_arrays(
+        pa.array([0] * len(rows), type=pa.int8()),
+        pa.array([month])
+    ))
+    return pa.RecordBatch.from_arrays(arrays, schema=snapshot_schema())
+
+async def write_partition(month: str, directory: str = SNAPSHOT_DIR, chunk_size: int = 10000) -> int:
+    """
+    Write one month of health plans to an uncompressed Arrow IPC file.
+
+    Rows are streamed from the database chunk_size at a time and written as
+    record batches, then the file is swapped in atomically so readers never
+    see a partial partition. Returns the number of rows written.
+    """
+    import pyarrow as pa
+
+    os.makedirs(directory, exist_ok=True)
+    start, end = month_range(month)
+    path = partition_path(month, directory)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+
+    rows_written = 0
+    try:
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, snapshot_schema()) as writer:
+            async with AsyncSessionLocal() as db:
+                result = await db.stream(
+                    export_query(created_from=start, created_to=end).execution_options(yield_per=chunk_size)
+                )
+                async for rows in result.partitions():
+                    writer.write_batch(_record_batch(rows, month))
+                    rows_written += len(rows)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return rows_written
+
+async def write_snapshots(months: Optional[list] = None, directory: str = SNAPSHOT_DIR) -> dict:
+    """
+    Snapshot the given months (default: every month with plans) and drop
+    partitions for months that no longer have any. Months are read from the
+    monthly time buckets rather than scanned from health_plans.
+    """
+    async with AsyncSessionLocal() as db:
+        stored = (await db.scalars(
+            select(PlanTimeBucket.bucket_start).where(
+                PlanTimeBucket.granularity == "month",
+                PlanTimeBucket.plan_count > 0
+            ).distinct()
+        )).all()
+    stored_months = sorted({start.strftime("%Y-%m") for start in stored})
+
+    written = {}
+    for month in months or stored_months:
+        written[month] = await write_partition(month, directory)
+
+    if months is None:
+        for month in set(list_partitions(directory)) - set(stored_months):
+            os.remove(partition_path(month, directory))
+
+    return written
+
+def read_snapshot(
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    directory: str = SNAPSHOT_DIR
+) -> "pa.Table":
+    """
+    Memory-map the partitions between from_month and to_month (inclusive).
+    Uncompressed IPC buffers are used in place, so nothing is copied or
+    decoded until a compute kernel touches it.
+    """
+    import pyarrow as pa
+
+    tables = []
+    for month in list_partitions(directory):
+        if (from_month and month < from_month) or (to_month and month > to_month):
+            continue
+        source = pa.memory_map(partition_path(month, directory), "r")
+        tables.append(pa.ipc.open_file(source).read_all())
+
+    if not tables:
+        return snapshot_schema().empty_table()
+    return pa.concat_tables(tables)
+
+def aggregate_snapshot(
+    group_by: list,
+    metrics: list,
+    aggregates: list,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    fitness_goal: Optional[str] = None,
+    directory: str = SNAPSHOT_DIR
+) -> dict:
+    """Run a GROUP BY aggregation over the snapshot with Arrow compute kernels"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = read_snapshot(from_month, to_month, directory)
+    if fitness_goal is not None:
+        table = table.filter(pc.equal(table["fitness_goal"], fitness_goal))
+
+    # Dictionary-encoded keys group as plain strings
+    if "month" in group_by:
+        table = table.set_column(
+            table.schema.get_field_index("month"), "month", table["month"].cast(pa.string())
+        )
+
+    result = table.group_by(group_by).aggregate(
+        [([], "count_all")] + [(metric, aggregate) for metric in metrics for aggregate in aggregates]
+    )
+    result = result.rename_columns([
+        "plan_count" if name == "count_all" else name
+        for name in result.column_names
+    ])
+    if group_by:
+        result = result.sort_by([(column, "ascending") for column in group_by])
+    rows = result.to_pylist()
+
+    return {"rows_scanned": table.num_rows, "rows": rows}
+
+async def query_snapshot(**kwargs) -> dict:
+    """aggregate_snapshot() on a worker thread; Arrow kernels release the GIL"""
+    return await asyncio.to_thread(aggregate_snapshot, **kwargs)
@@ -116,7 +116,10 @@ class HealthCalculator:
         return self.data['GENERAL_HEALTH_TIPS']
 
     def validate_input(self, user_data: dict) -> dict:
-        """Validate user input"""
+        """
+        Validate user input. For direct library callers; input that came
+        through UserDataRequest has already been checked.
+        """
         errors = []
         
         if not user_data.get('age') or user_data['age'] < 13 or user_data['age'] > 120:
@@ -142,12 +145,126 @@ class HealthCalculator:
             'errors': errors
         }
 
-    def generate_health_plan(self, user_data: dict) -> dict:
-        """Generate complete health plan"""
+    def calculate_batch_metrics(self, users: list) -> dict:
+        """
+        Calculate BMI, BMR, TDEE, daily calories and macros for many users at once.
+
+        Every column is computed in a single vectorized pass with the same
+        floating point operations, in the same order, as the scalar
+        calculate_* methods, so each row matches them exactly (numpy rounds
+        half to even, like Python's round()).
+        """
+        # numpy is only needed for batches; import it on first use, not at startup
+        import numpy as np
+
+        ages = np.array([user['age'] for user in users], dtype=np.float64)
+        heights = np.array([user['height'] for user in users], dtype=np.float64)
+        weights = np.array([user['weight'] for user in users], dtype=np.float64)
+        genders = np.array([str(getattr(user['gender'], 'value', user['gender'])) for user in users])
+        goals = [str(getattr(user['fitness_goal'], 'value', user['fitness_goal'])) for user in users]
+
+        # BMI
+        height_in_meters = heights / 100
+        bmi = weights / (height_in_meters * height_in_meters)
+        categories = list(self.data['BMI_CATEGORIES'].values())
+        category_index = np.select(
+            [(bmi >= value['min']) & (bmi <= value['max']) for value in categories],
+            list(range(len(categories))),
+            default=-1
+        )
+
+        # BMR (Harris-Benedict)
+        male_bmr = 88.362 + (13.397 * weights) + (4.799 * heights) - (5.677 * ages)
+        female_bmr = 447.593 + (9.247 * weights) + (3.098 * heights) - (4.330 * ages)
+        bmr = np.rint(np.where(
+            genders == 'male',
+            male_bmr,
+            np.where(genders == 'female', female_bmr, (male_bmr + female_bmr) / 2)
+        ))
+
+        # TDEE and daily calories
+        multipliers = np.array([
+            self.data['ACTIVITY_MULTIPLIERS'].get(str(getattr(user['activity_level'], 'value', user['activity_level'])), 1.2)
+            for user in users
+        ], dtype=np.float64)
+        tdee = np.rint(bmr * multipliers)
+
+        goal_data = [self.data['GOAL_CALORIE_ADJUSTMENTS'].get(goal, {}) for goal in goals]
+        adjustments = np.array([data.get('adjustment', 0) for data in goal_data], dtype=np.float64)
+        daily_calories = np.rint(tdee + adjustments)
+
+        # Macros
+        protein_ratios = np.array([data.get('proteinRatio', 0.3) for data in goal_data], dtype=np.float64)
+        carbs_ratios = np.array([data.get('carbsRatio', 0.45) for data in goal_data], dtype=np.float64)
+        fat_ratios = np.array([data.get('fatRatio', 0.25) for data in goal_data], dtype=np.float64)
+
+        return {
+            'bmi': np.rint(bmi * 10) / 10,
+            'bmi_category_index': category_index,
+            'bmr': bmr.astype(np.int64),
+            'tdee': tdee.astype(np.int64),
+            'daily_calories': daily_calories.astype(np.int64),
+            'protein_grams': np.rint((daily_calories * protein_ratios) / 4).astype(np.int64),
+            'protein_percentage': np.rint(protein_ratios * 100).astype(np.int64),
+            'carbs_grams': np.rint((daily_calories * carbs_ratios) / 4).astype(np.int64),
+            'carbs_percentage': np.rint(carbs_ratios * 100).astype(np.int64),
+            'fat_grams': np.rint((daily_calories * fat_ratios) / 9).astype(np.int64),
+            'fat_percentage': np.rint(fat_ratios * 100).astype(np.int64)
+        }
+
+    def generate_health_plans(self, users: list, validated: bool = False) -> list:
+        """
+        Generate the per-user part of health plans for a batch using the vectorized kernel.
+        Pass validated=True for rows already checked by UserDataRequest.
+        """
+        if not validated:
+            for user_data in users:
+                validation = self.validate_input(user_data)
+                if not validation['is_valid']:
+                    raise ValueError(f"Invalid input: {', '.join(validation['errors'])}")
+
+        batch = self.calculate_batch_metrics(users)
+        columns = {key: values.tolist() for key, values in batch.items()}
+        categories = list(self.data['BMI_CATEGORIES'].values())
+        sleep_recommendation = self.get_sleep_recommendation()
+
+        plans = []
+        for i, user_data in enumerate(users):
+            category_index = columns['bmi_category_index'][i]
+            category = categories[category_index] if category_index >= 0 else {'category': 'Unknown', 'color': '#718096'}
+            plans.append({
+                'user_data': user_data,
+                'metrics': {
+                    'bmi': {
+                        'value': columns['bmi'][i],
+                        'category': category['category'],
+                        'color': category['color']
+                    },
+                    'bmr': columns['bmr'][i],
+                    'tdee': columns['tdee'][i]
+                },
+                'dailyCalories': columns['daily_calories'][i],
+                'macros': {
+                    'protein': {'grams': columns['protein_grams'][i], 'percentage': columns['protein_percentage'][i]},
+                    'carbs': {'grams': columns['carbs_grams'][i], 'percentage': columns['carbs_percentage'][i]},
+                    'fat': {'grams': columns['fat_grams'][i], 'percentage': columns['fat_percentage'][i]}
+                },
+                'waterIntake': self.get_water_intake(user_data['weight'], user_data['activity_level']),
+                'sleepRecommendation': sleep_recommendation
+            })
+
+        return plans
+
+    def generate_health_plan(self, user_data: dict, validated: bool = False) -> dict:
+        """
+        Generate complete health plan.
+        Pass validated=True for input already checked by UserDataRequest.
+        """
         # Validate input
-        validation = self.validate_input(user_data)
-        if not validation['is_valid']:
-            raise ValueError(f"Invalid input: {', '.join(validation['errors'])}")
+        if not validated:
+            validation = self.validate_input(user_data)
+            if not validation['is_valid']:
+                raise ValueError(f"Invalid input: {', '.join(validation['errors'])}")
         
         # Calculate basic metrics
         bmi = self.calculate_bmi(user_data['weight'], user_data['height'])
@@ -0,0 +1,61 @@
+"""
+Pagination for FastAPI Backend
+Opaque keyset cursors over (timestamp, id)
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import tuple_
+
+# Response header carrying the next page's cursor on list-bodied listings
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the position after a row as an opaque cursor"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor into (created_at, id); raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+def keyset_page(
+    query,
+    model,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    order_by: str = "created_at"
+):
+    """
+    Order a select by (order_by, id) and position it for one page.
+
+    With a cursor the page starts right after the cursor row using an index
+    range on (order_by, id), so every page costs the same. Without one,
+    the legacy skip offset is applied. One extra row is requested so the
+    caller can tell whether a next page exists.
+    """
+    column = getattr(model, order_by)
+    query = query.order_by(column, model.id)
+    if cursor is not None:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(column, model.id) > tuple_(timestamp, row_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def split_page(rows: list, limit: int, order_by: str = "created_at") -> tuple:
+    """Trim the look-ahead row and build the next cursor: (rows, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, order_by), last.id)
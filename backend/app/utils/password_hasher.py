@@ -0,0 +1,166 @@
+"""
+Password Hasher for FastAPI Backend
+Bounded thread pool for bcrypt hashing and verification, off the event loop
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    The bcrypt CryptContext used for password hashing. passlib and bcrypt
+    are imported on first use so workers that never hash start faster.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class HasherBusyError(Exception):
+    """Raised when too many password operations are already waiting"""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on small dedicated thread pools.
+
+    bcrypt releases the GIL while it works, so hashing on threads keeps the
+    event loop free. At most max_workers single hash/verify calls run at
+    once, which leaves the remaining cores for other requests; up to
+    max_waiting more wait their turn, and beyond that HasherBusyError is
+    raised so a login storm is shed instead of queueing without bound.
+
+    Bulk jobs (hash_many) run on a separate pool of bulk_workers threads
+    (default: every core), so logins never queue behind an import.
+    """
+
+    def __init__(self, max_workers: int = 2, max_waiting: int = 256, bulk_workers: int = None, context=None):
+        self.max_workers = max_workers
+        self.max_waiting = max_waiting
+        self.bulk_workers = bulk_workers or os.cpu_count() or 1
+        self._context = context
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._bulk_executor = ThreadPoolExecutor(max_workers=self.bulk_workers, thread_name_prefix="password-hasher-bulk")
+        self._semaphore = None
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.bulk_running = 0
+        self.bulk_hashed = 0
+
+    @property
+    def context(self):
+        """The CryptContext in use, the shared one unless another was given"""
+        return self._context or get_pwd_context()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against its hash"""
+        return await self._submit(self.context.verify, password, hashed_password)
+
+    async def hash_many(self, passwords: list, batch_size: int = 8) -> list:
+        """
+        Hash many passwords on the bulk pool, one batch of batch_size per
+        bulk worker at a time. If a batch fails, batches not yet started are
+        cancelled before the error is raised.
+        """
+        loop = asyncio.get_running_loop()
+        batches = [passwords[start:start + batch_size] for start in range(0, len(passwords), batch_size)]
+        results = [None] * len(batches)
+
+        def hash_batch(batch):
+            return [self.context.hash(password) for password in batch]
+
+        async def run(index, batch):
+            self.bulk_running += 1
+            try:
+                results[index] = await loop.run_in_executor(self._bulk_executor, hash_batch, batch)
+                self.bulk_hashed += len(batch)
+            finally:
+                self.bulk_running -= 1
+
+        pending = set()
+        submitted = 0
+        try:
+            while submitted < len(batches) or pending:
+                while submitted < len(batches) and len(pending) < self.bulk_workers:
+                    pending.add(asyncio.ensure_future(run(submitted, batches[submitted])))
+                    submitted += 1
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        return [hashed for batch in results for hashed in batch]
+
+    async def _submit(self, func, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise HasherBusyError("Too many password operations in progress")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.perf_counter()
+        queue_seconds = started - queued_at
+        self.total_queue_seconds += queue_seconds
+        self.max_queue_seconds = max(self.max_queue_seconds, queue_seconds)
+
+        self.running += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except BaseException:
+            self._finish(started)
+            raise
+        # The worker is released when bcrypt actually finishes, even if the
+        # caller is cancelled first
+        future.add_done_callback(lambda future: self._finish(started, future))
+        return await asyncio.shield(future)
+
+    def _finish(self, started: float, future=None):
+        if future is not None and not future.cancelled():
+            future.exception()  # retrieved here in case the caller was cancelled
+        self.running -= 1
+        self.completed += 1
+        self.total_run_seconds += time.perf_counter() - started
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        """Get concurrency and queue-time metrics"""
+        return {
+            "max_workers": self.max_workers,
+            "max_waiting": self.max_waiting,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(self.total_queue_seconds / self.completed * 1000, 3) if self.completed else None,
+            "max_queue_ms": round(self.max_queue_seconds * 1000, 3),
+            "avg_hash_ms": round(self.total_run_seconds / self.completed * 1000, 3) if self.completed else None,
+            "bulk_workers": self.bulk_workers,
+            "bulk_running": self.bulk_running,
+            "bulk_hashed": self.bulk_hashed
+        }
+
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+    max_waiting=int(os.getenv("PASSWORD_HASH_MAX_WAITING", "256")),
+    bulk_workers=int(os.getenv("PASSWORD_HASH_BULK_WORKERS", str(os.cpu_count() or 1)))
+)
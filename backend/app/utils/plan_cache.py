@@ -0,0 +1,110 @@
+"""
+Plan Cache for FastAPI Backend
+Bounded LRU/TTL caches for generated health plans
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry time to live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+class PlanCache(LRUCache):
+    """
+    Cache of generated plans keyed on normalized user input.
+
+    FITNESS_DATA is static module data, so a change to it ships with a
+    deploy and the restarted workers start with empty caches.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+
+    def key_for(self, user_data: dict) -> tuple:
+        """Normalize user input into a cache key"""
+        return (
+            int(user_data['age']),
+            str(getattr(user_data['gender'], 'value', user_data['gender'])),
+            float(user_data['height']),
+            float(user_data['weight']),
+            str(getattr(user_data['activity_level'], 'value', user_data['activity_level'])),
+            str(getattr(user_data['fitness_goal'], 'value', user_data['fitness_goal']))
+        )
+
+plan_cache = PlanCache(
+    maxsize=int(os.getenv("PLAN_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PLAN_CACHE_TTL", "3600"))
+)
+
+# Recently fetched stored plans, keyed by plan ID. Each worker has its own
+# copy and a delete only invalidates the worker that handled it, so entries
+# expire quickly to bound how long other workers serve a deleted plan.
+hot_plan_cache = LRUCache(
+    maxsize=int(os.getenv("HOT_PLAN_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("HOT_PLAN_CACHE_TTL", "30"))
+)
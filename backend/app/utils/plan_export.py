@@ -0,0 +1,75 @@
+"""
+Plan Export for FastAPI Backend
+Streams stored health plans as NDJSON or CSV in constant memory
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.database import HealthPlan, read_replica
+
+EXPORT_COLUMNS = [column.name for column in HealthPlan.__table__.columns]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+def export_query(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    fitness_goal: Optional[str] = None
+):
+    """Select plain health_plans columns (no ORM objects) in primary key order"""
+    query = select(*HealthPlan.__table__.columns).order_by(HealthPlan.id)
+    if created_from is not None:
+        query = query.where(HealthPlan.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(HealthPlan.created_at < created_to)
+    if fitness_goal is not None:
+        query = query.where(HealthPlan.fitness_goal == fitness_goal)
+    return query
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _encode_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps({column: _json_value(value) for column, value in zip(EXPORT_COLUMNS, row)}, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [_json_value(value) for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+async def stream_health_plans(query, export_format: str = "ndjson", chunk_size: int = 1000):
+    """
+    Yield encoded chunks of health plans.
+
+    Rows are fetched through a server-side cursor chunk_size at a time, so
+    memory use does not depend on how many rows match. The generator owns
+    its session because it outlives the request handler.
+    """
+    if export_format == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(EXPORT_COLUMNS)
+        yield header.getvalue().encode("utf-8")
+        encode = _encode_csv
+    else:
+        encode = _encode_ndjson
+
+    async with read_replica.session() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield encode(rows)
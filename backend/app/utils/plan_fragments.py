@@ -0,0 +1,174 @@
+"""
+Plan Fragments for FastAPI Backend
+Pre-serialized static sections of HealthPlanResponse and raw JSON assembly
+"""
+
+from datetime import datetime
+from typing import Optional
+
+import orjson
+
+from app.models import ActivityRecommendations, TimelineEstimates
+from app.utils.data import FITNESS_DATA
+
+# Sections of HealthPlanResponse that depend only on fitness_goal (or nothing)
+STATIC_SECTIONS = ("activity_recommendations", "timeline_estimates", "nutrients", "health_tips")
+
+def encode_json(value) -> bytes:
+    """Encode a value the same way the default ORJSONResponse does"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def plan_metrics(health_plan: dict) -> dict:
+    """Flatten calculator metrics into the HealthMetrics shape"""
+    return {
+        "bmi": float(health_plan["metrics"]["bmi"]["value"]),
+        "bmi_category": health_plan["metrics"]["bmi"]["category"],
+        "bmr": float(health_plan["metrics"]["bmr"]),
+        "tdee": float(health_plan["metrics"]["tdee"])
+    }
+
+def plan_macros(health_plan: dict) -> dict:
+    """Flatten calculator macros into the Macronutrients shape"""
+    macros = health_plan["macros"]
+    return {
+        "protein_grams": macros["protein"]["grams"],
+        "protein_percentage": macros["protein"]["percentage"],
+        "carbs_grams": macros["carbs"]["grams"],
+        "carbs_percentage": macros["carbs"]["percentage"],
+        "fat_grams": macros["fat"]["grams"],
+        "fat_percentage": macros["fat"]["percentage"]
+    }
+
+def plan_timeline(timeline_estimates: dict) -> dict:
+    """Map calculator timeline estimates onto the TimelineEstimates shape"""
+    return {
+        "safe_rate": timeline_estimates["safeRate"],
+        "typical_duration": timeline_estimates["typicalDuration"],
+        "milestones": timeline_estimates["milestones"]
+    }
+
+def plan_from_record(record, data: dict = FITNESS_DATA) -> dict:
+    """
+    Rebuild the per-user part of a calculator plan from a stored health_plans row.
+
+    Nothing is recalculated: the BMI category is looked up from the stored
+    (rounded) BMI and the macro percentages from the goal's ratios.
+    """
+    category = 'Unknown'
+    color = '#718096'
+    if record.bmi is not None:
+        for value in data['BMI_CATEGORIES'].values():
+            if record.bmi >= value['min'] and record.bmi <= value['max']:
+                category = value['category']
+                color = value['color']
+                break
+
+    goal_data = data['GOAL_CALORIE_ADJUSTMENTS'].get(record.fitness_goal, {})
+    protein_ratio = goal_data.get('proteinRatio', 0.3)
+    carbs_ratio = goal_data.get('carbsRatio', 0.45)
+    fat_ratio = goal_data.get('fatRatio', 0.25)
+
+    return {
+        'metrics': {
+            'bmi': {'value': record.bmi, 'category': category, 'color': color},
+            'bmr': record.bmr,
+            'tdee': record.tdee
+        },
+        'dailyCalories': record.daily_calories,
+        'macros': {
+            'protein': {'grams': record.protein_grams, 'percentage': round(protein_ratio * 100)},
+            'carbs': {'grams': record.carbs_grams, 'percentage': round(carbs_ratio * 100)},
+            'fat': {'grams': record.fat_grams, 'percentage': round(fat_ratio * 100)}
+        },
+        'waterIntake': record.water_intake,
+        'sleepRecommendation': record.sleep_recommendation
+    }
+
+def record_user_data(record) -> dict:
+    """JSON-ready user_data section for a stored health_plans row"""
+    return {
+        "age": record.age,
+        "gender": record.gender,
+        "height": float(record.height),
+        "weight": float(record.weight),
+        "activity_level": record.activity_level,
+        "fitness_goal": record.fitness_goal
+    }
+
+def parse_include(include: Optional[str]) -> tuple:
+    """
+    Parse an ?include= projection into the static sections to return.
+    No parameter means every section; an empty value means none.
+    """
+    if include is None:
+        return STATIC_SECTIONS
+
+    requested = {section.strip() for section in include.split(",") if section.strip()}
+    unknown = requested - set(STATIC_SECTIONS)
+    if unknown:
+        raise ValueError(
+            f"Unknown include section(s): {sorted(unknown)}. Must be one of: {list(STATIC_SECTIONS)}"
+        )
+
+    # Keep the response field order stable regardless of request order
+    return tuple(section for section in STATIC_SECTIONS if section in requested)
+
+class PlanFragments:
+    """Static plan sections validated and encoded once per fitness goal"""
+
+    def __init__(self, data: dict = FITNESS_DATA):
+        self.data = data
+        self.build()
+
+    def build(self):
+        """(Re)encode all fragments from the current reference data"""
+        nutrients = encode_json(self.data['IMPORTANT_NUTRIENTS'])
+        health_tips = encode_json(list(self.data['GENERAL_HEALTH_TIPS']))
+
+        self._fragments = {}
+        for goal, activity in self.data['ACTIVITY_RECOMMENDATIONS'].items():
+            timeline = self.data['TIMELINE_ESTIMATES'].get(goal, self.data['TIMELINE_ESTIMATES']['lean-body'])
+            self._fragments[goal] = {
+                "activity_recommendations": encode_json(
+                    ActivityRecommendations(**activity).model_dump(mode="json")
+                ),
+                "timeline_estimates": encode_json(
+                    TimelineEstimates(**plan_timeline(timeline)).model_dump(mode="json")
+                ),
+                "nutrients": nutrients,
+                "health_tips": health_tips
+            }
+
+    def encode_user_fields(self, user_data: dict, health_plan: dict) -> bytes:
+        """Encode the per-user fields of a plan (user_data already JSON-ready), without the surrounding braces"""
+        fields = {
+            "user_data": user_data,
+            "metrics": plan_metrics(health_plan),
+            "daily_calories": health_plan["dailyCalories"],
+            "macros": plan_macros(health_plan),
+            "water_intake": health_plan["waterIntake"],
+            "sleep_recommendation": health_plan["sleepRecommendation"]
+        }
+        return encode_json(fields)[1:-1]
+
+    def render(
+        self,
+        user_fields: bytes,
+        goal: str,
+        created_at: datetime,
+        sections: tuple = STATIC_SECTIONS
+    ) -> bytes:
+        """Splice encoded per-user fields and static fragments into a HealthPlanResponse body"""
+        fragments = self._fragments.get(goal, self._fragments['lean-body'])
+
+        parts = [b"{", user_fields]
+        for section in sections:
+            parts.append(b',"' + section.encode("ascii") + b'":')
+            parts.append(fragments[section])
+        parts.append(b',"created_at":')
+        parts.append(encode_json(created_at.isoformat()))
+        parts.append(b"}")
+
+        return b"".join(parts)
+
+plan_fragments = PlanFragments()
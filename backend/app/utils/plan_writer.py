@@ -0,0 +1,192 @@
+"""
+Plan Writer for FastAPI Backend
+Write-behind persistence of generated health plans
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import insert
+
+from app.database import AsyncSessionLocal, HealthPlan
+from app.utils.rollups import apply_rollups
+from app.utils.sketches import distribution_sketches
+
+logger = logging.getLogger(__name__)
+
+class PlanQueueFullError(Exception):
+    """Raised when the write-behind queue stays full for longer than the enqueue timeout"""
+
+class PlanWriter:
+    """
+    Buffers health_plans rows in a bounded in-memory queue and drains them
+    in batched multi-row inserts from a background task.
+
+    A batch is flushed when it reaches flush_size rows or when flush_interval
+    seconds have passed since its first row, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        max_queue_size: int = 10000,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        enqueue_timeout: float = 2.0,
+        session_factory=AsyncSessionLocal
+    ):
+        self.enabled = enabled
+        self.max_queue_size = max_queue_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.session_factory = session_factory
+
+        self._queue = None
+        self._task = None
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.total_flush_seconds = 0.0
+        self.last_flush_seconds = None
+        self.max_flush_seconds = 0.0
+
+    async def start(self):
+        """Start the background consumer"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and stop the background consumer"""
+        if self._task is None:
+            return
+        task = self._task
+        if not task.done():
+            # The sentinel sits behind every queued row, so they all get written
+            # first. If the consumer dies while the queue is full, the put would
+            # never complete, so stop waiting for it as soon as the task ends.
+            put = asyncio.ensure_future(self._queue.put(None))
+            await asyncio.wait([put, task], return_when=asyncio.FIRST_COMPLETED)
+            if put.done():
+                await asyncio.wait([task])
+            else:
+                put.cancel()
+        self._task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Health plan writer stopped unexpectedly", exc_info=task.exception())
+
+        # Rows the consumer didn't get to are written here
+        await self._drain()
+
+    async def _drain(self):
+        batch = []
+        while not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is None:
+                continue
+            batch.append(record)
+            if len(batch) >= self.flush_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+    async def enqueue(self, record: dict):
+        """
+        Queue a health_plans row for writing.
+        Waits up to enqueue_timeout for space, then raises PlanQueueFullError.
+        When the consumer isn't running (outside the app's lifespan, or after
+        a failed startup) the row is written immediately instead.
+        """
+        if self._task is None:
+            await self._write([record])
+            self.written += 1
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(record), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PlanQueueFullError("Health plan write queue is full")
+        self.enqueued += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            record = await self._queue.get()
+            if record is None:
+                break
+
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.flush_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        started = time.perf_counter()
+        try:
+            await self._write(batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %d queued health plans", len(batch))
+        finally:
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.total_flush_seconds += elapsed
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    async def _write(self, batch: list):
+        async with self.session_factory() as db:
+            await db.execute(insert(HealthPlan), batch)
+            await apply_rollups(db, batch)
+            await db.commit()
+        distribution_sketches.add_plans(batch)
+
+    def stats(self) -> dict:
+        """Get queue depth and flush latency metrics"""
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "flush_size": self.flush_size,
+            "flush_interval_seconds": self.flush_interval,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3) if self.last_flush_seconds is not None else None,
+            "avg_flush_ms": round(self.total_flush_seconds / self.flushes * 1000, 3) if self.flushes else None,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3)
+        }
+
+plan_writer = PlanWriter(
+    enabled=os.getenv("PLAN_WRITE_MODE", "sync") == "write-behind",
+    max_queue_size=int(os.getenv("PLAN_WRITE_QUEUE_SIZE", "10000")),
+    flush_size=int(os.getenv("PLAN_WRITE_FLUSH_SIZE", "500")),
+    flush_interval=float(os.getenv("PLAN_WRITE_FLUSH_INTERVAL", "1.0")),
+    enqueue_timeout=float(os.getenv("PLAN_WRITE_ENQUEUE_TIMEOUT", "2.0"))
+)
@@ -0,0 +1,160 @@
+"""
+Progress History for FastAPI Backend
+Weekly/monthly progress rollups per user and downsampling of long weight series
+"""
+
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, delete, func
+
+from app.database import UserProgress, ProgressRollup
+from app.utils.rollups import bucket_start, dialect_insert
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Granularities kept in progress_rollups
+PROGRESS_GRANULARITIES = ("week", "month")
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+def accumulate_progress(buckets: dict, entries: list) -> dict:
+    """Add progress entries to per-(user, granularity, bucket) aggregates"""
+    for entry in entries:
+        weight = entry["current_weight"]
+        for granularity in PROGRESS_GRANULARITIES:
+            key = (entry["user_id"], granularity, bucket_start(entry["recorded_at"], granularity))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {"entry_count": 1, "weight_sum": weight, "weight_min": weight, "weight_max": weight}
+            else:
+                bucket["entry_count"] += 1
+                bucket["weight_sum"] += weight
+                bucket["weight_min"] = min(bucket["weight_min"], weight)
+                bucket["weight_max"] = max(bucket["weight_max"], weight)
+    return buckets
+
+def progress_rollup_rows(buckets: dict) -> list:
+    """Aggregates from accumulate_progress() as progress_rollups rows"""
+    return [
+        {"user_id": user_id, "granularity": granularity, "bucket_start": start, **values}
+        for (user_id, granularity, start), values in buckets.items()
+    ]
+
+async def apply_progress_rollups(db, entries: list):
+    """
+    Fold new progress entries into the rollups, inside the caller's
+    transaction. One upsert row per touched (user, granularity, bucket).
+    """
+    rows = progress_rollup_rows(accumulate_progress({}, entries))
+    if not rows:
+        return
+
+    insert = dialect_insert(db)
+    stmt = insert(ProgressRollup)
+    if db.get_bind().dialect.name == "postgresql":
+        smallest, largest = func.least, func.greatest
+    else:
+        # SQLite's two-argument min()/max() are scalar
+        smallest, largest = func.min, func.max
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProgressRollup.user_id, ProgressRollup.granularity, ProgressRollup.bucket_start],
+        set_={
+            "entry_count": ProgressRollup.entry_count + stmt.excluded.entry_count,
+            "weight_sum": ProgressRollup.weight_sum + stmt.excluded.weight_sum,
+            "weight_min": smallest(ProgressRollup.weight_min, stmt.excluded.weight_min),
+            "weight_max": largest(ProgressRollup.weight_max, stmt.excluded.weight_max)
+        }
+    )
+    await db.execute(stmt, rows)
+
+async def rebuild_progress_rollups(db, chunk_size: int = 10000) -> int:
+    """Recompute every progress rollup from user_progress; returns the rows written"""
+    return await db.run_sync(rebuild_progress_rollups_sync, chunk_size)
+
+def rebuild_progress_rollups_sync(db, chunk_size: int = 10000) -> int:
+    """rebuild_progress_rollups() on a sync session, as used by the schema migration"""
+    db.execute(delete(ProgressRollup))
+
+    buckets = {}
+    result = db.execute(
+        select(UserProgress.user_id, UserProgress.current_weight, UserProgress.recorded_at).where(
+            UserProgress.current_weight.isnot(None),
+            UserProgress.recorded_at.isnot(None)
+        ).execution_options(yield_per=chunk_size)
+    )
+    for entries in result.mappings().partitions():
+        accumulate_progress(buckets, entries)
+
+    rows = progress_rollup_rows(buckets)
+    for start in range(0, len(rows), chunk_size):
+        db.execute(ProgressRollup.__table__.insert(), rows[start:start + chunk_size])
+    db.commit()
+    return len(rows)
+
+def lttb(x: "np.ndarray", y: "np.ndarray", threshold: int) -> "np.ndarray":
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013): indices of
+    threshold (at least 3) points that keep the visual shape of the series.
+    The first and last points are always kept; from each bucket in between,
+    the point forming the largest triangle with the previous pick and the
+    next bucket's average is chosen.
+    """
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    selected[-1] = n - 1
+    return selected
+
+def minmax_buckets(y: "np.ndarray", threshold: int) -> "np.ndarray":
+    """
+    Indices of the minimum and maximum point of threshold // 2 equal-width
+    buckets, in time order. Keeps every spike, at the cost of a busier line.
+    """
+    import numpy as np
+
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, max(threshold // 2, 1) + 1).astype(int)
+    selected = []
+    for start, end in zip(edges, edges[1:]):
+        if start == end:
+            continue
+        low = start + int(y[start:end].argmin())
+        high = start + int(y[start:end].argmax())
+        selected.extend(sorted({low, high}))
+    return np.array(selected, dtype=int)
+
+def downsample(points: list, threshold: int, method: str = "lttb") -> list:
+    """Reduce points (dicts with recorded_at and weight) to at most threshold"""
+    if len(points) <= threshold:
+        return points
+
+    # numpy is only needed for long series; import it on first use, not at startup
+    import numpy as np
+
+    x = np.array([point["recorded_at"] for point in points], dtype="datetime64[us]").astype("int64").astype(float)
+    y = np.array([point["weight"] for point in points], dtype=float)
+    indices = lttb(x, y, threshold) if method == "lttb" else minmax_buckets(y, threshold)
+    return [points[index] for index in indices]
@@ -0,0 +1,254 @@
+"""
+Analytics Rollups for FastAPI Backend
+Running aggregates over health_plans, updated in the same transaction as each write
+"""
+
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import select, delete, func, case, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import HealthPlan, AnalyticsRollup, PlanTimeBucket
+
+# Metrics whose averages are served from the rollups
+ROLLUP_METRICS = ("bmi", "daily_calories", "bmr")
+
+# Granularities kept in plan_time_buckets, finest first
+TIME_GRANULARITIES = ("hour", "day", "week", "month")
+
+# Upper age bound (exclusive) for each age bucket; matches /analytics/overview
+AGE_GROUPS = (
+    (25, '18-24'),
+    (35, '25-34'),
+    (45, '35-44'),
+    (55, '45-54'),
+    (65, '55-64')
+)
+
+def age_group(age: int) -> str:
+    """Bucket an age the same way the overview's CASE expression does"""
+    for upper, label in AGE_GROUPS:
+        if age is not None and age < upper:
+            return label
+    return '65+'
+
+def age_group_expression():
+    """SQL equivalent of age_group() for rebuilds"""
+    return case(
+        *[(HealthPlan.age < upper, label) for upper, label in AGE_GROUPS],
+        else_='65+'
+    )
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Start of the hour, day, week (Monday) or month containing moment"""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}. Must be one of: {list(TIME_GRANULARITIES)}")
+
+def _value(row, column: str):
+    return row[column] if isinstance(row, dict) else getattr(row, column)
+
+def rollup_keys(row) -> list:
+    """Every (dimension, bucket) a health plan row counts towards"""
+    created_at = _value(row, "created_at") or datetime.utcnow()
+    return [
+        ("total", ""),
+        ("goal", _value(row, "fitness_goal")),
+        ("gender", _value(row, "gender")),
+        ("age_group", age_group(_value(row, "age"))),
+        ("day", created_at.date().isoformat())
+    ]
+
+def rollup_deltas(rows: list, sign: int = 1) -> dict:
+    """Aggregate rows into per-bucket deltas (sign=-1 for deletes)"""
+    deltas = {}
+    for row in rows:
+        for key in rollup_keys(row):
+            delta = deltas.setdefault(key, {
+                "plan_count": 0,
+                **{f"{metric}_sum": 0.0 for metric in ROLLUP_METRICS},
+                **{f"{metric}_count": 0 for metric in ROLLUP_METRICS}
+            })
+            delta["plan_count"] += sign
+            for metric in ROLLUP_METRICS:
+                value = _value(row, metric)
+                if value is not None:
+                    delta[f"{metric}_sum"] += sign * value
+                    delta[f"{metric}_count"] += sign
+    return deltas
+
+def time_bucket_deltas(rows: list, sign: int = 1) -> dict:
+    """Aggregate rows into per-(granularity, bucket_start, goal) count deltas"""
+    deltas = {}
+    for row in rows:
+        created_at = _value(row, "created_at") or datetime.utcnow()
+        goal = _value(row, "fitness_goal")
+        for granularity in TIME_GRANULARITIES:
+            key = (granularity, bucket_start(created_at, granularity), goal)
+            deltas[key] = deltas.get(key, 0) + sign
+    return deltas
+
+def dialect_insert(db):
+    """The session's dialect-specific insert(), which supports ON CONFLICT"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+async def apply_rollups(db, rows: list, sign: int = 1):
+    """
+    Add (or with sign=-1, remove) health plan rows to the rollups.
+
+    Runs inside the caller's transaction, so the rollups commit or roll back
+    together with the health_plans write. Each touched bucket is one upsert
+    row, however many plans are in the batch.
+    """
+    deltas = rollup_deltas(rows, sign)
+    if not deltas:
+        return
+
+    await _upsert(db, AnalyticsRollup, ("dimension", "bucket"), [
+        {"dimension": dimension, "bucket": bucket, **delta}
+        for (dimension, bucket), delta in deltas.items()
+    ])
+    await _upsert(db, PlanTimeBucket, ("granularity", "bucket_start", "fitness_goal"), [
+        {"granularity": granularity, "bucket_start": start, "fitness_goal": goal, "plan_count": count}
+        for (granularity, start, goal), count in time_bucket_deltas(rows, sign).items()
+    ])
+
+async def _upsert(db, model, key_columns: tuple, rows: list):
+    """Insert rows, adding every non-key column onto existing rows with the same key"""
+    insert = dialect_insert(db)
+    stmt = insert(model)
+    counters = [column for column in stmt.excluded.keys() if column not in key_columns]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[getattr(model, column) for column in key_columns],
+        set_={column: getattr(model, column) + getattr(stmt.excluded, column) for column in counters}
+    )
+    await db.execute(stmt, rows)
+
+async def read_rollups(db, days: int = 7) -> dict:
+    """
+    Read the rollups needed by the overview endpoints in one query:
+    every non-day bucket plus the last `days` calendar days.
+    """
+    first_day = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    rows = (await db.scalars(
+        select(AnalyticsRollup).where(
+            or_(AnalyticsRollup.dimension != "day", AnalyticsRollup.bucket >= first_day)
+        )
+    )).all()
+
+    rollups = {}
+    for row in rows:
+        if row.plan_count:
+            rollups.setdefault(row.dimension, {})[row.bucket] = row
+    return rollups
+
+async def read_time_series(db, granularity: str, start: datetime) -> list:
+    """
+    (bucket_start, fitness_goal, plan_count) rows from the first bucket
+    containing start onwards, in time order. A primary-key range scan, so
+    the cost depends on the number of buckets rather than plans.
+    """
+    return (await db.execute(
+        select(PlanTimeBucket.bucket_start, PlanTimeBucket.fitness_goal, PlanTimeBucket.plan_count).where(
+            PlanTimeBucket.granularity == granularity,
+            PlanTimeBucket.bucket_start >= bucket_start(start, granularity),
+            PlanTimeBucket.plan_count > 0
+        ).order_by(PlanTimeBucket.bucket_start)
+    )).all()
+
+def rollup_average(row, metric: str):
+    """Average of a metric over the plans in a rollup row, or None"""
+    if row is None:
+        return None
+    count = getattr(row, f"{metric}_count")
+    return getattr(row, f"{metric}_sum") / count if count else None
+
+async def rebuild_rollups(db) -> int:
+    """
+    Recompute every rollup from health_plans with GROUP BY queries.
+    Used to backfill existing data; returns the number of rollup rows written.
+    """
+    return await db.run_sync(rebuild_rollups_sync)
+
+def rebuild_rollups_sync(db) -> int:
+    """rebuild_rollups() on a sync session, as used by the schema migration"""
+    db.execute(delete(AnalyticsRollup))
+    db.execute(delete(PlanTimeBucket))
+
+    aggregates = [func.count(HealthPlan.id)]
+    for metric in ROLLUP_METRICS:
+        column = getattr(HealthPlan, metric)
+        aggregates += [func.coalesce(func.sum(column), 0), func.count(column)]
+
+    dimensions = {
+        "total": None,
+        "goal": HealthPlan.fitness_goal,
+        "gender": HealthPlan.gender,
+        "age_group": age_group_expression(),
+        "day": func.date(HealthPlan.created_at)
+    }
+
+    rollup_rows = []
+    for dimension, expression in dimensions.items():
+        if expression is None:
+            query = select(*aggregates)
+        else:
+            query = select(expression, *aggregates).group_by(expression)
+
+        for row in db.execute(query):
+            row = list(row)
+            bucket = "" if expression is None else row.pop(0)
+            if isinstance(bucket, date):
+                bucket = bucket.isoformat()
+            if not row[0]:
+                continue
+            values = {"plan_count": row[0]}
+            for index, metric in enumerate(ROLLUP_METRICS):
+                values[f"{metric}_sum"] = row[1 + 2 * index]
+                values[f"{metric}_count"] = row[2 + 2 * index]
+            rollup_rows.append({"dimension": dimension, "bucket": str(bucket), **values})
+
+    if rollup_rows:
+        db.execute(AnalyticsRollup.__table__.insert(), rollup_rows)
+
+    # Hourly counts come from one GROUP BY; coarser buckets are summed from them
+    hour = _hour_expression(db)
+    buckets = {}
+    for start, goal, count in db.execute(
+        select(hour, HealthPlan.fitness_goal, func.count(HealthPlan.id)).group_by(hour, HealthPlan.fitness_goal)
+    ):
+        if start is None:
+            continue
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)
+        for granularity in TIME_GRANULARITIES:
+            key = (granularity, bucket_start(start, granularity), goal)
+            buckets[key] = buckets.get(key, 0) + count
+
+    if buckets:
+        db.execute(PlanTimeBucket.__table__.insert(), [
+            {"granularity": granularity, "bucket_start": start, "fitness_goal": goal, "plan_count": count}
+            for (granularity, start, goal), count in buckets.items()
+        ])
+    db.commit()
+    return len(rollup_rows) + len(buckets)
+
+def _hour_expression(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.date_trunc("hour", HealthPlan.created_at)
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", HealthPlan.created_at)
+    raise NotImplementedError(f"Rollup rebuilds are not supported on {dialect}")
@@ -0,0 +1,426 @@
+"""
+Distribution Sketches for FastAPI Backend
+Mergeable KLL quantile sketches and HyperLogLog cardinality sketches over health plans
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import operator
+import os
+import random
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from app.database import AsyncSessionLocal, HealthPlan, AnalyticsSketch
+from app.utils.rollups import age_group
+
+logger = logging.getLogger(__name__)
+
+# Metrics with quantile sketches
+SKETCH_METRICS = ("bmi", "daily_calories", "bmr")
+
+# Ways a plan is grouped; "all" has a single bucket
+SKETCH_GROUPS = ("all", "goal", "gender", "age_group")
+
+# Documented error bounds at the default sketch sizes
+KLL_K = 200
+KLL_RANK_ERROR = 0.0165
+HLL_PRECISION = 12
+HLL_RELATIVE_ERROR = round(1.04 / math.sqrt(1 << HLL_PRECISION), 4)
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Keeps a stack of compactors; level h holds items of weight 2**h. When
+    the sketch is full, a level is sorted and every other item (random
+    offset) is promoted, halving its size. Sketches with the same k merge
+    by concatenating levels and compacting.
+
+    With k=200 the normalized rank error is about 1.65% (99% confidence),
+    i.e. the value returned for p99 has a true rank between ~97.3% and 100%.
+    """
+
+    def __init__(self, k: int = KLL_K, c: float = 2 / 3):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._set_levels([[]])
+
+    def _set_levels(self, compactors: list):
+        self.compactors = compactors
+        height = len(compactors)
+        self.capacities = [
+            int(math.ceil(self.c ** (height - level - 1) * self.k)) + 1
+            for level in range(height)
+        ]
+        self.max_size = sum(self.capacities)
+        self.size = sum(len(compactor) for compactor in compactors)
+
+    def update(self, value: float):
+        """Add one value"""
+        self.compactors[0].append(value)
+        self.size += 1
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.size >= self.max_size:
+            self._compress()
+
+    def update_many(self, values: list):
+        """Add many values, compacting once at the end instead of per value"""
+        if not values:
+            return
+        self.compactors[0].extend(values)
+        self.size += len(values)
+        self.count += len(values)
+        low, high = min(values), max(values)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        while self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) < self.capacities[level]:
+                continue
+            if level + 1 == len(self.compactors):
+                self._set_levels(self.compactors + [[]])
+
+            compactor.sort()
+            # An odd item out stays behind at this level
+            keep = [compactor.pop()] if len(compactor) % 2 else []
+            promoted = compactor[random.randint(0, 1)::2]
+            self.compactors[level + 1].extend(promoted)
+            self.compactors[level] = keep
+            self.size -= len(compactor) - len(promoted)
+
+            if self.size < self.max_size:
+                break
+
+    def merge(self, other: "KLLSketch"):
+        """Fold another sketch into this one"""
+        if other.count == 0:
+            return
+        compactors = [list(compactor) for compactor in self.compactors]
+        compactors += [[] for _ in range(len(other.compactors) - len(compactors))]
+        for level, compactor in enumerate(other.compactors):
+            compactors[level].extend(compactor)
+        self._set_levels(compactors)
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantile(self, q: float):
+        """Approximate value at quantile q (0-1)"""
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        weighted = sorted(
+            (value, 1 << level)
+            for level, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "count": self.count, "min": self.min, "max": self.max, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch._set_levels([list(compactor) for compactor in data["compactors"]] or [[]])
+        return sketch
+
+def hll_position(value: str, p: int = HLL_PRECISION) -> tuple:
+    """
+    HyperLogLog (register index, rank) of an item, so one hash can be
+    added to several sketches
+    """
+    hashed = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+    index = hashed >> (64 - p)
+    remainder = hashed & ((1 << (64 - p)) - 1)
+    return index, (64 - p) - remainder.bit_length() + 1
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (Flajolet et al., 2007) with linear
+    counting for small cardinalities. With p=12 (4096 registers) the
+    standard error is 1.04 / sqrt(4096), about 1.6%. Merging takes the
+    register-wise maximum.
+    """
+
+    def __init__(self, p: int = HLL_PRECISION):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value: str):
+        """Add one item"""
+        self.add_positions([hll_position(value, self.p)])
+
+    def add_positions(self, positions: list):
+        """Add items by their hll_position()"""
+        registers = self.registers
+        for index, rank in positions:
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        """Fold another sketch into this one"""
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self) -> int:
+        """Approximate number of distinct items added"""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> dict:
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        sketch = cls(p=data["p"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+# Columns identifying a user profile for distinct counting
+PROFILE_COLUMNS = ("age", "gender", "height", "weight", "activity_level")
+
+def _getter(row, *columns):
+    """Fetch columns from rows shaped like row (dicts or ORM objects) in one call"""
+    return operator.itemgetter(*columns) if isinstance(row, dict) else operator.attrgetter(*columns)
+
+class DistributionSketches:
+    """
+    Sketches per (metric, group, bucket): the stored ones as of the last
+    load or persist, plus the pending changes since, which every plan
+    insert adds to and which are periodically merged into the
+    analytics_sketches table. Queries combine the two.
+
+    Only the changes since the last persist are merged into the stored
+    sketches, with the rows locked for the read-merge-write (FOR UPDATE on
+    Postgres, BEGIN IMMEDIATE on SQLite), so several workers can share the
+    table. Changes whose persist fails are kept for the next one. Deleted
+    plans are not subtracted: sketches describe plans as generated.
+    """
+
+    def __init__(self, persist_interval: float = 60.0, session_factory=AsyncSessionLocal):
+        self.persist_interval = persist_interval
+        self.session_factory = session_factory
+        self.sketches = {}
+        self.pending = {}
+        self.persisted_at = None
+        self.loaded_at = None
+        self._task = None
+
+    @staticmethod
+    def _new(key: str):
+        return HyperLogLog() if key.startswith("profiles|") else KLLSketch()
+
+    def _sketch(self, store: dict, key: str):
+        sketch = store.get(key)
+        if sketch is None:
+            sketch = store[key] = self._new(key)
+        return sketch
+
+    def add_plans(self, rows: list):
+        """Record newly stored plans"""
+        if not rows:
+            return
+        # Each plan counts towards "all" and one bucket of every other group
+        profile = _getter(rows[0], *PROFILE_COLUMNS)
+        positions = [hll_position("|".join(map(str, profile(row)))) for row in rows]
+        metrics = _getter(rows[0], *SKETCH_METRICS)
+        columns = dict(zip(SKETCH_METRICS, zip(*map(metrics, rows))))
+
+        # Row indices per (group, bucket); values are then added a bucket at a time
+        groups = _getter(rows[0], "fitness_goal", "gender", "age")
+        buckets = {}
+        for index, (goal, gender, age) in enumerate(map(groups, rows)):
+            for group_bucket in (("goal", goal), ("gender", gender), ("age_group", age_group(age))):
+                buckets.setdefault(group_bucket, []).append(index)
+        buckets[("all", "")] = range(len(rows))
+
+        for (group, bucket), indices in buckets.items():
+            every_row = len(indices) == len(rows)
+            self._sketch(self.pending, f"profiles|{group}|{bucket}").add_positions(
+                positions if every_row else [positions[index] for index in indices]
+            )
+            for metric, column in columns.items():
+                values = column if every_row else [column[index] for index in indices]
+                self._sketch(self.pending, f"{metric}|{group}|{bucket}").update_many(
+                    [float(value) for value in values if value is not None]
+                )
+
+    def current(self, key: str):
+        """The stored sketch for key combined with its pending changes, or None"""
+        stored = self.sketches.get(key)
+        pending = self.pending.get(key)
+        if pending is None:
+            return stored
+        combined = self._new(key)
+        for sketch in (stored, pending):
+            if sketch is not None:
+                combined.merge(sketch)
+        return combined
+
+    def query(self, metric: str, group: str, quantiles: list) -> dict:
+        """Quantiles and distinct profile counts for every bucket of a group"""
+        prefix = f"{metric}|{group}|"
+        buckets = {}
+        for key in sorted(set(self.sketches) | set(self.pending)):
+            if not key.startswith(prefix):
+                continue
+            sketch = self.current(key)
+            bucket = key[len(prefix):]
+            profiles = self.current(f"profiles|{group}|{bucket}")
+            buckets[bucket or "all"] = {
+                "count": sketch.count,
+                "distinct_profiles": profiles.estimate() if profiles else 0,
+                "min": sketch.min,
+                "max": sketch.max,
+                "quantiles": {f"p{q * 100:g}": sketch.quantile(q) for q in quantiles}
+            }
+        return buckets
+
+    async def load(self):
+        """Replace the in-memory sketches with the stored ones"""
+        async with self.session_factory() as db:
+            rows = (await db.scalars(select(AnalyticsSketch))).all()
+        sketches = {}
+        for row in rows:
+            data = json.loads(row.payload)
+            sketches[row.key] = HyperLogLog.from_dict(data) if row.key.startswith("profiles|") else KLLSketch.from_dict(data)
+        self.sketches = sketches
+        self.loaded_at = datetime.utcnow()
+
+    async def persist(self):
+        """Merge pending changes into the stored sketches"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+
+        try:
+            merged_sketches = await self._merge_into_table(pending)
+        except BaseException:
+            # Keep the changes for the next persist
+            for key, sketch in pending.items():
+                self._sketch(self.pending, key).merge(sketch)
+            raise
+        self.sketches.update(merged_sketches)
+        self.persisted_at = datetime.utcnow()
+
+    async def _merge_into_table(self, pending: dict) -> dict:
+        async with self.session_factory() as db:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite only begins a transaction at the first write, and
+                # SQLite ignores FOR UPDATE; take the write lock before reading
+                # so two workers can't both merge into the same stored sketch
+                await db.execute(text("BEGIN IMMEDIATE"))
+            stored = {
+                row.key: row
+                for row in (await db.scalars(
+                    select(AnalyticsSketch).where(AnalyticsSketch.key.in_(list(pending))).with_for_update()
+                )).all()
+            }
+            merged_sketches = {}
+            for key, sketch in pending.items():
+                row = stored.get(key)
+                if row is None:
+                    merged = self._new(key)
+                    row = AnalyticsSketch(key=key)
+                    db.add(row)
+                else:
+                    data = json.loads(row.payload)
+                    merged = HyperLogLog.from_dict(data) if key.startswith("profiles|") else KLLSketch.from_dict(data)
+                merged.merge(sketch)
+                row.payload = json.dumps(merged.to_dict(), separators=(",", ":"))
+                row.updated_at = datetime.utcnow()
+                merged_sketches[key] = merged
+            await db.commit()
+        return merged_sketches
+
+    async def rebuild(self) -> int:
+        """Recompute every sketch from health_plans and overwrite the stored ones"""
+        self.sketches = {}
+        self.pending = {}
+        async with self.session_factory() as db:
+            result = await db.stream(select(HealthPlan).execution_options(yield_per=1000))
+            async for rows in result.scalars().partitions():
+                self.add_plans(rows)
+            await db.execute(AnalyticsSketch.__table__.delete())
+            await db.commit()
+        await self.persist()
+        return len(self.sketches)
+
+    async def start(self):
+        """
+        Load stored sketches and start periodic persistence. If the table
+        can't be read yet, the worker starts with empty sketches and the
+        load is retried before each persist.
+        """
+        await self._try_load()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop periodic persistence and save pending changes"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+    async def _try_load(self):
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Failed to load distribution sketches; starting with empty sketches")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            if self.loaded_at is None:
+                await self._try_load()
+            try:
+                await self.persist()
+            except Exception:
+                logger.exception("Failed to persist distribution sketches")
+
+distribution_sketches = DistributionSketches(
+    persist_interval=float(os.getenv("SKETCH_PERSIST_INTERVAL", "60"))
+)
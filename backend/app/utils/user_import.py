@@ -0,0 +1,195 @@
+"""
+User Import for FastAPI Backend
+Streams CSV or NDJSON user records into the users table in validated, bulk-inserted chunks
+"""
+
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import select, or_
+
+from app.database import AsyncSessionLocal, User
+from app.models import UserCreate
+from app.utils.rollups import dialect_insert
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+async def iter_lines(chunks):
+    """Split an async stream of byte chunks into decoded lines"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+async def iter_records(lines, import_format: str):
+    """
+    Yield (row_number, record) pairs, one record per non-blank line (CSV
+    records continue over line breaks inside quoted fields). CSV input
+    needs a header row; records that can't be parsed are yielded as the
+    exception so they are reported like any other bad row.
+    """
+    header = None
+    row_number = 0
+    async for text in csv_records(lines) if import_format == "csv" else lines:
+        if not text.strip():
+            continue
+        if import_format == "csv" and header is None:
+            header = next(csv.reader([text], strict=True))
+            continue
+
+        row_number += 1
+        try:
+            if import_format == "csv":
+                values = next(csv.reader([text], strict=True))
+                if len(values) != len(header):
+                    raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+                yield row_number, dict(zip(header, values))
+            else:
+                record = json.loads(text)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object")
+                yield row_number, record
+        except (ValueError, csv.Error) as e:
+            yield row_number, e
+
+async def csv_records(lines):
+    """
+    Join lines into whole CSV records: a line break inside a quoted field
+    (an odd number of quote characters so far) continues the record.
+    """
+    parts = []
+    quotes = 0
+    async for line in lines:
+        parts.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield "\n".join(parts)
+            parts = []
+            quotes = 0
+    if parts:
+        # Unterminated quoted field; the strict csv.reader reports it as a bad row
+        yield "\n".join(parts)
+
+class UserImport:
+    """
+    Imports users chunk_size records at a time.
+
+    Per chunk: rows are validated with UserCreate, duplicates are checked
+    against the table with one query (and against earlier rows of the same
+    import in memory), passwords are hashed in parallel on the hasher's
+    bulk pool with no database connection held, and the survivors go in
+    with one INSERT ... ON CONFLICT DO NOTHING, so a user registered
+    concurrently fails its row, not the chunk.
+    Bad rows are reported and skipped.
+    """
+
+    def __init__(self, hasher, chunk_size: int = 500, max_errors: int = 1000, session_factory=AsyncSessionLocal):
+        self.hasher = hasher
+        # Keeps each chunk's hashing and insert short
+        self.chunk_size = max(1, min(chunk_size, hasher.max_waiting))
+        self.max_errors = max_errors
+        self.session_factory = session_factory
+
+        self.total_rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._seen_emails = set()
+        self._seen_usernames = set()
+
+    def _error(self, row_number: int, message: str, email: str = None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "email": email, "error": message})
+
+    async def run(self, records) -> dict:
+        """Import every (row_number, record) pair and return the report"""
+        chunk = []
+        async for row_number, record in records:
+            chunk.append((row_number, record))
+            if len(chunk) >= self.chunk_size:
+                await self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            await self._import_chunk(chunk)
+        return self.report()
+
+    async def _import_chunk(self, chunk: list):
+        self.total_rows += len(chunk)
+
+        # Validate, and drop repeats within this import
+        users = []
+        for row_number, record in chunk:
+            if isinstance(record, Exception):
+                self._error(row_number, f"Unreadable record: {record}")
+                continue
+            try:
+                user = UserCreate(**record)
+            except ValidationError as e:
+                self._error(row_number, "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ), record.get("email"))
+                continue
+            if user.email in self._seen_emails or user.username in self._seen_usernames:
+                self._error(row_number, "Duplicate email or username earlier in this import", user.email)
+                continue
+            self._seen_emails.add(user.email)
+            self._seen_usernames.add(user.username)
+            users.append((row_number, user))
+        if not users:
+            return
+
+        async with self.session_factory() as db:
+            # One round trip for the whole chunk's uniqueness check
+            existing = (await db.execute(
+                select(User.email, User.username).where(or_(
+                    User.email.in_([user.email for _, user in users]),
+                    User.username.in_([user.username for _, user in users])
+                ))
+            )).all()
+        taken_emails = {email for email, _ in existing}
+        taken_usernames = {username for _, username in existing}
+
+        fresh = []
+        for row_number, user in users:
+            if user.email in taken_emails or user.username in taken_usernames:
+                self._error(row_number, "User with this email or username already exists", user.email)
+            else:
+                fresh.append((row_number, user))
+        if not fresh:
+            return
+
+        # Hashed with no connection held; users registered meanwhile are
+        # caught by ON CONFLICT DO NOTHING below
+        hashed_passwords = await self.hasher.hash_many([user.password for _, user in fresh])
+
+        async with self.session_factory() as db:
+            insert = dialect_insert(db)
+            inserted = set((await db.execute(
+                insert(User).on_conflict_do_nothing().returning(User.email),
+                [
+                    {"email": user.email, "username": user.username, "hashed_password": hashed, "is_active": True}
+                    for (_, user), hashed in zip(fresh, hashed_passwords)
+                ]
+            )).scalars().all())
+            await db.commit()
+
+        for row_number, user in fresh:
+            if user.email in inserted:
+                self.imported += 1
+            else:
+                self._error(row_number, "User with this email or username already exists", user.email)
+
+    def report(self) -> dict:
+        return {
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
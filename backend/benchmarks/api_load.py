@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+In-process load and latency benchmark for the API routes
+
+Drives the real app (app.main) through httpx's ASGI transport against a
+freshly migrated and seeded database, so results cover routing,
+validation, database access and serialization without network noise.
+For every scenario and concurrency level it reports throughput and
+p50/p95/p99 latency, and writes everything to a JSON file.
+
+Scenarios:
+  generate                POST /health-plans/generate with random input
+  plan                    GET  /health-plans/{id}
+  plans_list              GET  /health-plans?limit=100
+  users_list              GET  /users?limit=100
+  progress_list           GET  /progress/{id}?limit=100
+  login                   POST /users/login (bcrypt-bound)
+  analytics_overview      GET  /analytics/overview
+  analytics_goal          GET  /analytics/goals/{goal}
+  analytics_trends        GET  /analytics/trends?window=180&granularity=day
+  analytics_insights      GET  /analytics/insights
+  analytics_distribution  GET  /analytics/distributions?group_by=goal
+
+By default the database is a temporary SQLite file; --database-url points
+the run at another database instead (it must be empty or disposable, it is
+migrated and seeded). Pass --compare with an earlier results file to print
+the change per scenario; the exit status is 1 if any p95 or throughput
+moved the wrong way by more than --tolerance.
+
+Usage (from the backend directory):
+    python -m benchmarks.api_load --plans 50000 --users 1000 --concurrency 1 16 64
+    python -m benchmarks.api_load --scenarios generate,login --requests 200
+    python -m benchmarks.api_load --compare benchmarks/results/api_load-20240101T000000.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GOALS = ["weight-loss", "weight-gain", "lean-body"]
+GENDERS = ["male", "female", "other"]
+ACTIVITY_LEVELS = ["sedentary", "lightly-active", "moderately-active", "very-active", "extremely-active"]
+
+# Password of every seeded user; hashed once and shared so seeding stays fast
+PASSWORD = "benchmark-password"
+
+# Users that get progress entries
+PROGRESS_USERS = 10
+
+def plan_input() -> dict:
+    return {
+        "age": random.randint(18, 80),
+        "gender": random.choice(GENDERS),
+        "height": round(random.uniform(150, 200), 1),
+        "weight": round(random.uniform(45, 140), 1),
+        "activity_level": random.choice(ACTIVITY_LEVELS),
+        "fitness_goal": random.choice(GOALS)
+    }
+
+SCENARIOS = {
+    "generate": lambda dataset: ("POST", "/api/v1/health-plans/generate", plan_input()),
+    "plan": lambda dataset: ("GET", f"/api/v1/health-plans/{random.randint(1, dataset['plans'])}", None),
+    "plans_list": lambda dataset: ("GET", "/api/v1/health-plans?limit=100", None),
+    "users_list": lambda dataset: ("GET", "/api/v1/users?limit=100", None),
+    "progress_list": lambda dataset: (
+        "GET", f"/api/v1/progress/{random.randint(1, min(PROGRESS_USERS, dataset['users']))}?limit=100", None
+    ),
+    "login": lambda dataset: (
+        "POST", "/api/v1/users/login",
+        {"email": f"user{random.randint(1, dataset['users'])}@example.com", "password": PASSWORD}
+    ),
+    "analytics_overview": lambda dataset: ("GET", "/api/v1/analytics/overview", None),
+    "analytics_goal": lambda dataset: ("GET", f"/api/v1/analytics/goals/{random.choice(GOALS)}", None),
+    "analytics_trends": lambda dataset: ("GET", "/api/v1/analytics/trends?window=180&granularity=day", None),
+    "analytics_insights": lambda dataset: ("GET", "/api/v1/analytics/insights", None),
+    "analytics_distribution": lambda dataset: ("GET", "/api/v1/analytics/distributions?group_by=goal", None)
+}
+
+async def seed(dataset: dict, days: int):
+    """Insert plans, users and progress entries, then rebuild every derived table"""
+    from sqlalchemy import insert
+
+    from app.database import AsyncSessionLocal, HealthPlan, User, UserProgress
+    from app.utils.health_calculator import HealthCalculator
+    from app.utils.password_hasher import get_pwd_context
+    from app.utils.progress_history import rebuild_progress_rollups
+    from app.utils.rollups import rebuild_rollups
+    from app.utils.sketches import distribution_sketches
+
+    calculator = HealthCalculator()
+    now = datetime.utcnow()
+    chunk_size = 5000
+
+    async with AsyncSessionLocal() as db:
+        for start in range(0, dataset["plans"], chunk_size):
+            inputs = [plan_input() for _ in range(min(chunk_size, dataset["plans"] - start))]
+            plans = calculator.generate_health_plans(inputs, validated=True)
+            await db.execute(insert(HealthPlan), [
+                {
+                    **user_data,
+                    "bmi": plan["metrics"]["bmi"]["value"],
+                    "bmr": plan["metrics"]["bmr"],
+                    "tdee": plan["metrics"]["tdee"],
+                    "daily_calories": plan["dailyCalories"],
+                    "protein_grams": plan["macros"]["protein"]["grams"],
+                    "carbs_grams": plan["macros"]["carbs"]["grams"],
+                    "fat_grams": plan["macros"]["fat"]["grams"],
+                    "water_intake": plan["waterIntake"],
+                    "sleep_recommendation": plan["sleepRecommendation"],
+                    "created_at": now - timedelta(seconds=random.uniform(0, days * 86400))
+                }
+                for user_data, plan in zip(inputs, plans)
+            ])
+
+        hashed_password = get_pwd_context().hash(PASSWORD)
+        for start in range(0, dataset["users"], chunk_size):
+            await db.execute(insert(User), [
+                {
+                    "email": f"user{i}@example.com",
+                    "username": f"user{i}",
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                    "created_at": now - timedelta(minutes=i)
+                }
+                for i in range(start + 1, min(start + chunk_size, dataset["users"]) + 1)
+            ])
+
+        progress_users = min(PROGRESS_USERS, dataset["users"])
+        for start in range(0, dataset["progress_entries"], chunk_size):
+            await db.execute(insert(UserProgress), [
+                {
+                    "user_id": i % progress_users + 1,
+                    "current_weight": round(random.uniform(60, 100), 1),
+                    "recorded_at": now - timedelta(hours=i)
+                }
+                for i in range(start, min(start + chunk_size, dataset["progress_entries"]))
+            ])
+        await db.commit()
+
+        await rebuild_rollups(db)
+    async with AsyncSessionLocal() as db:
+        await rebuild_progress_rollups(db)
+    await distribution_sketches.rebuild()
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_scenario(client, name: str, dataset: dict, concurrency: int, total_requests: int) -> dict:
+    make_request = SCENARIOS[name]
+    method, path, body = make_request(dataset)
+    await client.request(method, path, json=body)  # warm up pools and caches
+
+    latencies = []
+    status_codes = {}
+    remaining = iter(range(total_requests))
+
+    async def worker():
+        for _ in remaining:
+            method, path, body = make_request(dataset)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": sum(count for code, count in status_codes.items() if code >= 400),
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+        "throughput_rps": total_requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: list, dataset: dict, baseline_path: str, tolerance: float) -> bool:
+    """Print the change against a previous run; True if nothing regressed beyond tolerance"""
+    with open(baseline_path) as f:
+        previous_run = json.load(f)
+    baseline = {(result["scenario"], result["concurrency"]): result for result in previous_run["results"]}
+
+    ok = True
+    print(f"\nvs {baseline_path} (tolerance {tolerance:.0%})")
+    if previous_run["meta"]["dataset"] != dataset:
+        print(f"warning: that run used dataset {previous_run['meta']['dataset']}")
+    print(f"{'scenario':<24}{'conc':>6}{'req/s':>10}{'p95':>10}")
+    for result in results:
+        previous = baseline.get((result["scenario"], result["concurrency"]))
+        if previous is None:
+            continue
+        throughput_change = result["throughput_rps"] / previous["throughput_rps"] - 1
+        p95_change = result["p95_ms"] / previous["p95_ms"] - 1
+        regressed = throughput_change < -tolerance or p95_change > tolerance
+        ok = ok and not regressed
+        print(
+            f"{result['scenario']:<24}{result['concurrency']:>6}{throughput_change:>+10.1%}{p95_change:>+10.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+async def main(args):
+    random.seed(args.seed)
+    url = args.database_url
+    if url is None:
+        directory = tempfile.mkdtemp(prefix="api_load_")
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    # app.database builds its engines at import, so configure it first
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.pop("READ_DATABASE_URL", None)
+
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {unknown}. Must be among: {list(SCENARIOS)}")
+
+    sys.path.insert(0, BACKEND_DIR)
+    from manage import run_migrations
+
+    import httpx
+    from app.database import DATABASE_PROFILE
+    from app.main import app
+
+    dataset = {"plans": args.plans, "users": args.users, "progress_entries": args.progress_entries}
+    print(f"Migrating and seeding {url}: {dataset} ...")
+    run_migrations()
+    await seed(dataset, args.days)
+
+    results = []
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for concurrency in args.concurrency:
+                for name in scenarios:
+                    print(f"{name} x{concurrency} ...")
+                    results.append(await run_scenario(client, name, dataset, concurrency, args.requests))
+    finally:
+        await app.router.shutdown()
+
+    print(f"\nrequests={args.requests} per scenario, dataset={dataset}")
+    print(f"{'scenario':<24}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for result in results:
+        print(
+            f"{result['scenario']:<24}{result['concurrency']:>6}{result['throughput_rps']:>10.1f}"
+            f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}"
+        )
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, "benchmarks", "results", f"api_load-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "database": url.split(":", 1)[0],
+                "database_profile": DATABASE_PROFILE,
+                "dataset": dataset,
+                "days": args.days,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "seed": args.seed
+            },
+            "results": results
+        }, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare and not compare(results, dataset, args.compare, args.tolerance):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync database URL to migrate and seed (default: temporary SQLite file)")
+    parser.add_argument("--plans", type=int, default=50000, help="health_plans rows to seed")
+    parser.add_argument("--users", type=int, default=1000, help="users to seed")
+    parser.add_argument("--progress-entries", type=int, default=10000, help=f"progress entries to seed, spread over {PROGRESS_USERS} users")
+    parser.add_argument("--days", type=int, default=180, help="seeded plans are spread over this many past days")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16], help="concurrent clients (several values run each level)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--scenarios", default=None, help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for data and request mix")
+    parser.add_argument("--output", default=None, help="results JSON path (default: benchmarks/results/api_load-<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression for --compare")
+    asyncio.run(main(parser.parse_args()))
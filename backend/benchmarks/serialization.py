@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Response serialization: validated models + JSONResponse vs direct orjson
+
+For each endpoint, the same in-memory rows are turned into response bytes
+two ways:
+
+  before  build the response model (validating every field), let FastAPI
+          validate it again against response_model, then encode with the
+          stdlib JSONResponse - how the routers used to respond
+  after   the routers' current path: trusted rows go straight into an
+          ORJSONResponse
+
+No database or HTTP is involved, so the numbers are serialization cost
+alone. Both paths must produce the same JSON; the script checks that.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.database import User, HealthPlan, UserProgress
+from app.models import (
+    UserResponse, HealthPlanRecord, ProgressResponse, ProgressPage,
+    ProgressPoint, ProgressHistory, UserDataRequest, BatchHealthPlanItem, BatchHealthPlanResponse,
+    GoalRecommendations
+)
+from app.routers.users import user_fields
+from app.routers.progress import progress_fields, point_fields
+from app.utils.health_calculator import HealthCalculator
+from app.utils.plan_fragments import plan_metrics, plan_macros, plan_timeline
+
+GOALS = ["weight-loss", "weight-gain", "lean-body"]
+GENDERS = ["male", "female", "other"]
+
+def fastapi_json(model_class, content) -> bytes:
+    """Validate against response_model and encode, as FastAPI does for returned models"""
+    field = create_response_field(name="response", type_=model_class)
+    value = asyncio.run(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return JSONResponse(value).body
+
+def users_case(rows: int):
+    now = datetime.utcnow()
+    users = [
+        User(id=i, email=f"user{i}@example.com", username=f"user{i}", is_active=True, created_at=now)
+        for i in range(rows)
+    ]
+
+    def before():
+        return fastapi_json(List[UserResponse], [
+            UserResponse(
+                id=user.id, email=user.email, username=user.username,
+                is_active=user.is_active, created_at=user.created_at
+            )
+            for user in users
+        ])
+
+    def after():
+        return ORJSONResponse([user_fields(user) for user in users]).body
+
+    return before, after
+
+def health_plans_case(rows: int):
+    now = datetime.utcnow()
+    plans = [
+        HealthPlan(
+            id=i, user_id=None, age=random.randint(13, 90), gender=random.choice(GENDERS),
+            height=random.uniform(150, 200), weight=random.uniform(45, 140), activity_level="sedentary",
+            fitness_goal=random.choice(GOALS), bmi=random.uniform(17, 40), bmr=random.uniform(1200, 2400),
+            tdee=random.uniform(1500, 3500), daily_calories=random.randint(1200, 3800), protein_grams=150,
+            carbs_grams=250, fat_grams=70, water_intake="2.5-3.0 liters", sleep_recommendation="7-9 hours",
+            created_at=now
+        )
+        for i in range(rows)
+    ]
+
+    def before():
+        return fastapi_json(List[HealthPlanRecord], [
+            HealthPlanRecord(**{column: getattr(plan, column) for column in HealthPlanRecord.model_fields})
+            for plan in plans
+        ])
+
+    def after():
+        return ORJSONResponse(
+            [{column: getattr(plan, column) for column in HealthPlanRecord.model_fields} for plan in plans]
+        ).body
+
+    return before, after
+
+def batch_case(rows: int):
+    calculator = HealthCalculator()
+    users = [
+        UserDataRequest(
+            age=random.randint(18, 80), gender=random.choice(GENDERS), height=random.uniform(150, 200),
+            weight=random.uniform(45, 140), activity_level="sedentary", fitness_goal=random.choice(GOALS)
+        )
+        for _ in range(rows)
+    ]
+    plans = calculator.generate_health_plans([user.model_dump() for user in users])
+    goals = sorted({user.fitness_goal.value for user in users})
+    created_at = datetime.utcnow()
+
+    def recommendations(goal):
+        return GoalRecommendations(
+            activity_recommendations=calculator.get_activity_recommendations(goal),
+            timeline_estimates=plan_timeline(calculator.get_timeline_estimates(goal))
+        )
+
+    def before():
+        return fastapi_json(BatchHealthPlanResponse, BatchHealthPlanResponse(
+            total_plans=len(plans),
+            plans=[
+                BatchHealthPlanItem(
+                    user_data=user, metrics=plan_metrics(plan), daily_calories=plan["dailyCalories"],
+                    macros=plan_macros(plan), water_intake=plan["waterIntake"],
+                    sleep_recommendation=plan["sleepRecommendation"]
+                )
+                for user, plan in zip(users, plans)
+            ],
+            goal_recommendations={goal: recommendations(goal) for goal in goals},
+            created_at=created_at
+        ))
+
+    def after():
+        return ORJSONResponse({
+            "total_plans": len(plans),
+            "plans": [
+                {
+                    "user_data": user.model_dump(mode="json"),
+                    "metrics": plan_metrics(plan),
+                    "daily_calories": plan["dailyCalories"],
+                    "macros": plan_macros(plan),
+                    "water_intake": plan["waterIntake"],
+                    "sleep_recommendation": plan["sleepRecommendation"]
+                }
+                for user, plan in zip(users, plans)
+            ],
+            "goal_recommendations": {goal: recommendations(goal).model_dump(mode="json") for goal in goals},
+            "created_at": created_at
+        }).body
+
+    return before, after
+
+def progress_case(rows: int):
+    start = datetime(2024, 1, 1)
+    entries = [
+        UserProgress(
+            id=i, user_id=1, current_weight=80 - i * 0.01, current_height=180.0, notes=None,
+            recorded_at=start + timedelta(hours=i)
+        )
+        for i in range(rows)
+    ]
+
+    def before():
+        return fastapi_json(ProgressPage, ProgressPage(
+            items=[
+                ProgressResponse(
+                    id=entry.id, user_id=entry.user_id, current_weight=entry.current_weight,
+                    current_height=entry.current_height, notes=entry.notes, recorded_at=entry.recorded_at
+                )
+                for entry in entries
+            ],
+            next_cursor=None
+        ))
+
+    def after():
+        return ORJSONResponse({"items": [progress_fields(entry) for entry in entries], "next_cursor": None}).body
+
+    return before, after
+
+def history_case(rows: int):
+    start = datetime(2024, 1, 1)
+    points = [{"recorded_at": start + timedelta(hours=i), "weight": 80 - i * 0.01} for i in range(rows)]
+
+    def before():
+        return fastapi_json(ProgressHistory, ProgressHistory(
+            user_id=1, resolution="raw", method=None, source_points=len(points),
+            points=[ProgressPoint(**point) for point in points]
+        ))
+
+    def after():
+        return ORJSONResponse({
+            "user_id": 1, "resolution": "raw", "method": None, "source_points": len(points),
+            "points": [point_fields(point) for point in points]
+        }).body
+
+    return before, after
+
+def trends_case(rows: int):
+    start = datetime(2024, 1, 1)
+    trends = [{"bucket": (start + timedelta(hours=i)).isoformat(), "count": i} for i in range(rows)]
+    goal_trends = {goal: {trend["bucket"]: trend["count"] for trend in trends} for goal in GOALS}
+    content = {
+        "trends": trends, "goal_trends": goal_trends, "granularity": "hour",
+        "period": "last_30_days", "generated_at": start
+    }
+
+    def before():
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def after():
+        return ORJSONResponse(content).body
+
+    return before, after
+
+CASES = {
+    "GET /users": users_case,
+    "GET /health-plans": health_plans_case,
+    "POST /health-plans/generate/batch": batch_case,
+    "GET /progress/{id}": progress_case,
+    "GET /progress/{id}/history": history_case,
+    "GET /analytics/trends": trends_case
+}
+
+def timed(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def main(args):
+    random.seed(0)
+    print(f"rows={args.rows} repeat={args.repeat} (median per response)")
+    print(f"{'endpoint':<36}{'before ms':>12}{'after ms':>12}{'speedup':>10}{'bytes':>10}")
+    for name, case in CASES.items():
+        before, after = case(args.rows)
+        if json.loads(before()) != json.loads(after()):
+            raise SystemExit(f"{name}: responses differ")
+        before_seconds = timed(before, args.repeat)
+        after_seconds = timed(after, args.repeat)
+        print(
+            f"{name:<36}{before_seconds * 1000:>12.2f}{after_seconds * 1000:>12.2f}"
+            f"{before_seconds / after_seconds:>9.1f}x{len(after()):>10}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="items per response")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per endpoint and path")
+    main(parser.parse_args())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Cold-start report for the API worker
+
+Each run starts a fresh interpreter that imports app.main under
+`python -X importtime` and then runs the app's startup and shutdown
+handlers, as a new uvicorn worker would. The report gives the median over
+runs of:
+
+  - total import and initialization time
+  - import time per package (self time of every module, grouped by its
+    top-level package; app modules are listed individually)
+  - time spent in each startup handler
+
+The database is a temporary SQLite file migrated with manage.py, so the
+startup handlers see a real schema.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup_time --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints its timings as JSON
+CHILD = """
+import asyncio, json, time
+
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def initialize():
+    handlers = {}
+    for handler in app.main.app.router.on_startup:
+        handler_started = time.perf_counter()
+        result = handler()
+        if asyncio.iscoroutine(result):
+            await result
+        handlers[handler.__name__] = time.perf_counter() - handler_started
+    for handler in app.main.app.router.on_shutdown:
+        result = handler()
+        if asyncio.iscoroutine(result):
+            await result
+    return handlers
+
+handlers = asyncio.run(initialize())
+print(json.dumps({"import": imported - started, "startup": handlers}))
+"""
+
+def module_group(module: str) -> str:
+    """App modules are reported individually, everything else by package"""
+    if module == "app" or module.startswith("app."):
+        return module
+    return module.split(".")[0]
+
+def parse_importtime(stderr: str) -> dict:
+    """Self time in seconds per module group from -X importtime output"""
+    groups = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:"):].split("|")
+        group = module_group(module.strip())
+        groups[group] = groups.get(group, 0.0) + int(self_us) / 1e6
+    return groups
+
+def run_once(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["modules"] = parse_importtime(result.stderr)
+    return timings
+
+def median_by_key(samples: list) -> dict:
+    keys = {key for sample in samples for key in sample}
+    return {key: statistics.median(sample.get(key, 0.0) for sample in samples) for key in keys}
+
+def main(args):
+    directory = tempfile.mkdtemp(prefix="startup_time_")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'startup.db')}")
+    env.pop("READ_DATABASE_URL", None)
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, check=True
+    )
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    import_seconds = statistics.median(run["import"] for run in runs)
+    startup = median_by_key([run["startup"] for run in runs])
+    modules = median_by_key([run["modules"] for run in runs])
+    startup_seconds = sum(startup.values())
+
+    print(f"\nruns={args.runs} (medians)")
+    print(f"{'import app.main':<40}{import_seconds * 1000:>10.1f} ms")
+    print(f"{'startup handlers':<40}{startup_seconds * 1000:>10.1f} ms")
+    print(f"{'total':<40}{(import_seconds + startup_seconds) * 1000:>10.1f} ms")
+
+    print(f"\n{'import self time by module':<40}{'ms':>10}{'share':>8}")
+    total_import = sum(modules.values())
+    for module, seconds in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{module:<40}{seconds * 1000:>10.1f}{seconds / total_import:>8.1%}")
+
+    print(f"\n{'startup handler':<40}{'ms':>10}")
+    for handler, seconds in sorted(startup.items(), key=lambda item: item[1], reverse=True):
+        print(f"{handler:<40}{seconds * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=20, help="module groups to list")
+    main(parser.parse_args())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Plan-generation input validation: three checks vs one pass
+
+Times what /health-plans/generate and /health-plans/generate/batch do to
+a parsed request body before any plan is calculated:
+
+  before  Field constraints, then the v1-style @validator methods on
+          UserDataRequest repeating them, then .dict() twice (cache key and
+          calculator) and HealthCalculator.validate_input once more
+  after   UserDataRequest's native constraints in one pydantic-core pass
+          and a single model_dump()
+
+The "before" model is reconstructed here as it was.
+
+Usage (from the backend directory):
+    python -m benchmarks.validation --repeat 2000 --batch-size 10000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import warnings
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.models import UserDataRequest, BatchUserDataRequest, Gender, ActivityLevel, FitnessGoal
+from app.utils.health_calculator import HealthCalculator
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from pydantic import validator
+
+    class LegacyUserDataRequest(BaseModel):
+        age: int = Field(..., ge=13, le=120)
+        gender: Gender
+        height: float = Field(..., ge=100, le=250)
+        weight: float = Field(..., ge=30, le=300)
+        activity_level: ActivityLevel
+        fitness_goal: FitnessGoal
+
+        @validator('age')
+        def validate_age(cls, v):
+            if v < 13 or v > 120:
+                raise ValueError('Age must be between 13 and 120 years')
+            return v
+
+        @validator('height')
+        def validate_height(cls, v):
+            if v < 100 or v > 250:
+                raise ValueError('Height must be between 100 and 250 cm')
+            return v
+
+        @validator('weight')
+        def validate_weight(cls, v):
+            if v < 30 or v > 300:
+                raise ValueError('Weight must be between 30 and 300 kg')
+            return v
+
+    class LegacyBatchUserDataRequest(BaseModel):
+        users: list[LegacyUserDataRequest] = Field(..., min_length=1, max_length=50000)
+
+calculator = HealthCalculator()
+
+def body() -> dict:
+    return {
+        "age": random.randint(13, 120),
+        "gender": random.choice(["male", "female", "other"]),
+        "height": round(random.uniform(100, 250), 1),
+        "weight": round(random.uniform(30, 300), 1),
+        "activity_level": random.choice([level.value for level in ActivityLevel]),
+        "fitness_goal": random.choice([goal.value for goal in FitnessGoal])
+    }
+
+def before_single(data: dict) -> dict:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        user = LegacyUserDataRequest(**data)
+        user.dict()  # plan cache key
+        fields = user.dict()
+    if not calculator.validate_input(fields)["is_valid"]:
+        raise ValueError("invalid")
+    return fields
+
+def after_single(data: dict) -> dict:
+    return UserDataRequest(**data).model_dump()
+
+def before_batch(data: dict) -> list:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        rows = [user.dict() for user in LegacyBatchUserDataRequest(**data).users]
+    for fields in rows:
+        if not calculator.validate_input(fields)["is_valid"]:
+            raise ValueError("invalid")
+    return rows
+
+def after_batch(data: dict) -> list:
+    return [user.model_dump() for user in BatchUserDataRequest(**data).users]
+
+def timed(func, argument, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(argument)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def main(args):
+    random.seed(0)
+    single = body()
+    batch = {"users": [body() for _ in range(args.batch_size)]}
+    if before_single(single) != after_single(single) or before_batch(batch) != after_batch(batch):
+        raise SystemExit("before and after disagree on valid input")
+    for bad in ({**single, "age": 5}, {**single, "weight": 500}, {**single, "gender": "unknown"}):
+        for func in (before_single, after_single):
+            try:
+                func(bad)
+            except ValidationError:
+                continue
+            raise SystemExit(f"{func.__name__} accepted {bad}")
+
+    single_before = timed(before_single, single, args.repeat)
+    single_after = timed(after_single, single, args.repeat)
+    batch_repeat = max(1, args.repeat // 200)
+    batch_before = timed(before_batch, batch, batch_repeat)
+    batch_after = timed(after_batch, batch, batch_repeat)
+
+    print(f"repeat={args.repeat} batch_size={args.batch_size} (median)")
+    print(f"{'request':<32}{'before':>12}{'after':>12}{'speedup':>10}")
+    print(
+        f"{'generate (per request)':<32}{single_before * 1e6:>10.1f}us{single_after * 1e6:>10.1f}us"
+        f"{single_before / single_after:>9.1f}x"
+    )
+    print(
+        f"{'generate/batch (per request)':<32}{batch_before * 1000:>10.1f}ms{batch_after * 1000:>10.1f}ms"
+        f"{batch_before / batch_after:>9.1f}x"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="timed single-plan validations")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows in the batch request")
+    main(parser.parse_args())
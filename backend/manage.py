@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Management commands for Fitness Health Planner FastAPI application
+
+Usage (from the backend directory):
+    python manage.py migrate [--revision REV]
+    python manage.py rebuild-rollups
+    python manage.py rebuild-sketches
+    python manage.py rebuild-progress-rollups
+    python manage.py export-snapshots [--month YYYY-MM ...]
+    python manage.py import-users users.csv [--format csv|ndjson]
+"""
+
+import argparse
+import asyncio
+import os
+
+from app.database import engine, AsyncSessionLocal
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Revision matching the schema the original create_all produced; later
+# revisions add what was built on top of it
+BASELINE_REVISION = "0001"
+
+def run_migrations(revision: str = "head"):
+    """
+    Upgrade the database to revision with Alembic. A database created by
+    create_all before migrations were introduced is stamped with the
+    baseline revision first, so its original tables are not re-created and
+    the later revisions still add the rollup tables and indexes and
+    backfill the rollups from the existing data.
+    """
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "users" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
+async def migrate(args):
+    """Apply database migrations (run before starting the API)"""
+    run_migrations(args.revision)
+    print(f"Database migrated to {args.revision}")
+
+async def rebuild_rollups(args):
+    """Backfill analytics rollups from the health_plans table"""
+    from app.utils.rollups import rebuild_rollups as rebuild
+
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild(db)
+    print(f"Rebuilt {rows} analytics rollup rows")
+
+async def rebuild_sketches(args):
+    """Rebuild distribution sketches from the health_plans table"""
+    from app.utils.sketches import distribution_sketches
+
+    sketches = await distribution_sketches.rebuild()
+    print(f"Rebuilt {sketches} distribution sketches")
+
+async def rebuild_progress_rollups(args):
+    """Backfill weekly and monthly progress rollups from the user_progress table"""
+    from app.utils.progress_history import rebuild_progress_rollups as rebuild
+
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild(db)
+    print(f"Rebuilt {rows} progress rollup rows")
+
+async def export_snapshots(args):
+    """Write health_plans to month-partitioned Arrow IPC snapshots"""
+    from app.utils.columnar_store import write_snapshots, SNAPSHOT_DIR
+
+    written = await write_snapshots(args.month)
+    for month, rows in written.items():
+        print(f"{month}: {rows} rows")
+    print(f"Wrote {len(written)} partitions to {SNAPSHOT_DIR}")
+
+async def import_users(args):
+    """Bulk-import users from a CSV (with header) or NDJSON file"""
+    from app.utils.password_hasher import PasswordHasher
+    from app.utils.user_import import UserImport, iter_records
+
+    import_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    async def lines():
+        with open(args.path, encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+
+    # Offline import: hash on every core, in chunks as large as requested
+    hasher = PasswordHasher(bulk_workers=os.cpu_count() or 1, max_waiting=100000)
+    report = await UserImport(hasher, chunk_size=args.chunk_size).run(iter_records(lines(), import_format))
+
+    for error in report["errors"]:
+        print(f"row {error['row']}: {error['error']}")
+    print(f"Imported {report['imported']} of {report['total_rows']} users ({report['failed']} failed)")
+
+COMMANDS = {
+    "migrate": migrate,
+    "rebuild-rollups": rebuild_rollups,
+    "rebuild-sketches": rebuild_sketches,
+    "rebuild-progress-rollups": rebuild_progress_rollups,
+    "export-snapshots": export_snapshots,
+    "import-users": import_users
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fitness Health Planner management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help=migrate.__doc__)
+    migrate_parser.add_argument("--revision", default="head", help="Alembic revision to upgrade to")
+    subparsers.add_parser("rebuild-rollups", help=rebuild_rollups.__doc__)
+    subparsers.add_parser("rebuild-sketches", help=rebuild_sketches.__doc__)
+    subparsers.add_parser("rebuild-progress-rollups", help=rebuild_progress_rollups.__doc__)
+    export_parser = subparsers.add_parser("export-snapshots", help=export_snapshots.__doc__)
+    export_parser.add_argument("--month", action="append", help="YYYY-MM month to write (repeatable; default: all)")
+    import_parser = subparsers.add_parser("import-users", help=import_users.__doc__)
+    import_parser.add_argument("path", help="CSV or NDJSON file of email, username and password")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"], help="Default: from the file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=1000, help="Records per bulk insert")
+
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command](args))
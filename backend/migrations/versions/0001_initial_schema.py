@@ -0,0 +1,81 @@
+"""Initial schema: users, health_plans and user_progress as create_all built them
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('health_plans',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('gender', sa.String(), nullable=True),
+    sa.Column('height', sa.Float(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=True),
+    sa.Column('activity_level', sa.String(), nullable=True),
+    sa.Column('fitness_goal', sa.String(), nullable=True),
+    sa.Column('bmi', sa.Float(), nullable=True),
+    sa.Column('bmr', sa.Float(), nullable=True),
+    sa.Column('tdee', sa.Float(), nullable=True),
+    sa.Column('daily_calories', sa.Integer(), nullable=True),
+    sa.Column('protein_grams', sa.Integer(), nullable=True),
+    sa.Column('carbs_grams', sa.Integer(), nullable=True),
+    sa.Column('fat_grams', sa.Integer(), nullable=True),
+    sa.Column('water_intake', sa.String(), nullable=True),
+    sa.Column('sleep_recommendation', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_health_plans_id', 'health_plans', ['id'], unique=False)
+    op.create_index('ix_health_plans_user_id', 'health_plans', ['user_id'], unique=False)
+    op.create_table('user_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('current_weight', sa.Float(), nullable=True),
+    sa.Column('current_height', sa.Float(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('recorded_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_progress_id', 'user_progress', ['id'], unique=False)
+    op.create_index('ix_user_progress_user_id', 'user_progress', ['user_id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
+    op.drop_index('ix_user_progress_user_id', table_name='user_progress')
+    op.drop_index('ix_user_progress_id', table_name='user_progress')
+    op.drop_table('user_progress')
+    op.drop_index('ix_health_plans_user_id', table_name='health_plans')
+    op.drop_index('ix_health_plans_id', table_name='health_plans')
+    op.drop_table('health_plans')
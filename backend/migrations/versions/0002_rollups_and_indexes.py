@@ -0,0 +1,101 @@
+"""Analytics rollups, sketches, time buckets, progress rollups and keyset indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+Databases built by create_all after some of these were added already have
+them, so existing tables and indexes are skipped. The rollups are then
+rebuilt from the plans and progress entries already stored, as the
+rebuild-rollups and rebuild-progress-rollups commands do.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.utils.rollups import rebuild_rollups_sync
+from app.utils.progress_history import rebuild_progress_rollups_sync
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    tables, indexes = set(), set()
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        tables = set(inspector.get_table_names())
+        indexes = {
+            index['name'] for table in ('health_plans', 'user_progress', 'users')
+            for index in inspector.get_indexes(table)
+        }
+
+    if 'analytics_rollups' not in tables:
+        op.create_table('analytics_rollups',
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('bucket', sa.String(), nullable=False),
+        sa.Column('plan_count', sa.Integer(), nullable=False),
+        sa.Column('bmi_sum', sa.Float(), nullable=False),
+        sa.Column('bmi_count', sa.Integer(), nullable=False),
+        sa.Column('daily_calories_sum', sa.Float(), nullable=False),
+        sa.Column('daily_calories_count', sa.Integer(), nullable=False),
+        sa.Column('bmr_sum', sa.Float(), nullable=False),
+        sa.Column('bmr_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'bucket')
+        )
+    if 'analytics_sketches' not in tables:
+        op.create_table('analytics_sketches',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+        )
+    if 'ix_health_plans_created_at_id' not in indexes:
+        op.create_index('ix_health_plans_created_at_id', 'health_plans', ['created_at', 'id'], unique=False)
+    if 'ix_health_plans_goal_created_at' not in indexes:
+        op.create_index('ix_health_plans_goal_created_at', 'health_plans', ['fitness_goal', 'created_at'], unique=False)
+    if 'plan_time_buckets' not in tables:
+        op.create_table('plan_time_buckets',
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('fitness_goal', sa.String(), nullable=False),
+        sa.Column('plan_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('granularity', 'bucket_start', 'fitness_goal')
+        )
+    if 'progress_rollups' not in tables:
+        op.create_table('progress_rollups',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.Column('weight_sum', sa.Float(), nullable=False),
+        sa.Column('weight_min', sa.Float(), nullable=True),
+        sa.Column('weight_max', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'granularity', 'bucket_start')
+        )
+    if 'ix_user_progress_user_recorded_at' not in indexes:
+        op.create_index('ix_user_progress_user_recorded_at', 'user_progress', ['user_id', 'recorded_at', 'id'], unique=False)
+    if 'ix_users_created_at_id' not in indexes:
+        op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+    if not context.is_offline_mode():
+        with Session(bind=op.get_bind()) as session:
+            rebuild_rollups_sync(session)
+            rebuild_progress_rollups_sync(session)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_user_progress_user_recorded_at', table_name='user_progress')
+    op.drop_table('progress_rollups')
+    op.drop_table('plan_time_buckets')
+    op.drop_index('ix_health_plans_goal_created_at', table_name='health_plans')
+    op.drop_index('ix_health_plans_created_at_id', table_name='health_plans')
+    op.drop_table('analytics_sketches')
+    op.drop_table('analytics_rollups')
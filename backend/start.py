@@ -13,6 +13,10 @@ if __name__ == "__main__":
     
     # Change to the backend directory
     os.chdir(backend_dir)
+
+    # Bring the database schema up to date once, before any worker starts
+    from manage import run_migrations
+    run_migrations()
     
     # Run the FastAPI application
     uvicorn.run(
@@ -0,0 +1,91 @@
+"""
+The vectorized batch kernel must produce exactly what the per-row
+calculator produces, for every field the batch endpoint returns.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from app.models import ActivityLevel, FitnessGoal, Gender, UserDataRequest
+from app.utils.health_calculator import HealthCalculator
+
+# Fields generate_health_plans() fills in; the rest of a plan is shared
+BATCH_FIELDS = ("user_data", "metrics", "dailyCalories", "macros", "waterIntake", "sleepRecommendation")
+
+GENDERS = [gender.value for gender in Gender]
+ACTIVITY_LEVELS = [level.value for level in ActivityLevel]
+FITNESS_GOALS = [goal.value for goal in FitnessGoal]
+
+def random_users(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "age": rng.randint(13, 120),
+            "gender": rng.choice(GENDERS),
+            "height": round(rng.uniform(100, 250), rng.choice([0, 1, 2])),
+            "weight": round(rng.uniform(30, 300), rng.choice([0, 1, 2])),
+            "activity_level": rng.choice(ACTIVITY_LEVELS),
+            "fitness_goal": rng.choice(FITNESS_GOALS)
+        }
+        for _ in range(count)
+    ]
+
+def edge_users() -> list:
+    """Every goal and activity level at the input limits and around BMI category edges"""
+    bodies = [
+        # (age, height, weight)
+        (13, 100, 30), (120, 250, 300), (13, 250, 30), (120, 100, 300),
+        # BMI 18.4 / 18.45 / 18.5, 24.9 / 24.95 / 25, 29.9 / 29.95 / 30 at 200 cm;
+        # the values between categories fall in no category ('Unknown')
+        (30, 200, 73.6), (30, 200, 73.8), (30, 200, 74.0),
+        (30, 200, 99.6), (30, 200, 99.8), (30, 200, 100.0),
+        (30, 200, 119.6), (30, 200, 119.8), (30, 200, 120.0),
+        (45, 175.5, 76.55)
+    ]
+    return [
+        {
+            "age": age,
+            "gender": gender,
+            "height": height,
+            "weight": weight,
+            "activity_level": activity_level,
+            "fitness_goal": fitness_goal
+        }
+        for (age, height, weight), gender, activity_level, fitness_goal in itertools.product(
+            bodies, GENDERS, ACTIVITY_LEVELS, FITNESS_GOALS
+        )
+    ]
+
+def assert_matches_per_row(users: list, validated: bool = False):
+    calculator = HealthCalculator()
+    batch = calculator.generate_health_plans(users, validated=validated)
+    assert len(batch) == len(users)
+    for user_data, plan in zip(users, batch):
+        expected = calculator.generate_health_plan(user_data, validated=validated)
+        assert {field: plan[field] for field in BATCH_FIELDS} == {field: expected[field] for field in BATCH_FIELDS}, user_data
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_per_row_for_random_users(seed):
+    assert_matches_per_row(random_users(2000, seed))
+
+def test_batch_matches_per_row_at_edges():
+    assert_matches_per_row(edge_users())
+
+def test_batch_matches_per_row_for_validated_request_rows():
+    # The batch endpoint passes model_dump() rows, which carry enum members
+    users = [UserDataRequest(**user).model_dump() for user in random_users(500, seed=42) + edge_users()]
+    assert_matches_per_row(users, validated=True)
+
+def test_batch_matches_per_row_for_a_single_user():
+    assert_matches_per_row(random_users(1, seed=7))
+
+def test_batch_rejects_invalid_rows_like_per_row():
+    users = random_users(10, seed=3)
+    users[4] = {**users[4], "age": 12}
+    calculator = HealthCalculator()
+    with pytest.raises(ValueError, match="Age must be between 13 and 120 years"):
+        calculator.generate_health_plans(users)
+    with pytest.raises(ValueError, match="Age must be between 13 and 120 years"):
+        calculator.generate_health_plan(users[4])